@@ -7,27 +7,53 @@ Just provide passenger info when booking.
 """
 
 import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
 import psycopg2.extras
-import json
+import psycopg2.pool
+import orjson
+from cachetools import TTLCache, cached
+from cachetools.keys import hashkey
+import atexit
 import logging
-from datetime import datetime, timedelta
+import re
+import threading
+import time
 from typing import Optional
+from collections import Counter
 from contextlib import contextmanager
-import random
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+from functools import partial
+import hashlib
+import secrets
 import os
 
 from fastmcp import FastMCP
 
 from dotenv import load_dotenv
-load_dotenv() # This loads variables from the .env file
+if not os.environ.get("DATABASE_URL"):
+    load_dotenv() # This loads variables from the .env file
 
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "WARNING").upper(),
+    format="%(asctime)s %(levelname)s %(name)s %(message)s"
+)
 logger = logging.getLogger("airline-booking-mcp")
 
 # Database configuration
 DB_URL = os.getenv("DATABASE_URL")
+DB_CONNECT_KWARGS = psycopg2.extensions.parse_dsn(DB_URL) if DB_URL else {}
+DB_POOL_MIN_CONN = int(os.getenv("DB_POOL_MIN_CONN", "2"))
+DB_POOL_MAX_CONN = int(os.getenv("DB_POOL_MAX_CONN", "16"))
+# Server-side PREPARE only lasts on session-level connections. Leave it off
+# behind a transaction-mode pooler such as PgBouncer (e.g. Neon's pooled host).
+DB_PREPARE_STATEMENTS = os.getenv("DB_PREPARE_STATEMENTS", "0") == "1"
+# Pooled connections idle for longer than this are pinged before reuse, since
+# the server may have dropped them (restart, failover, Neon autosuspend)
+DB_POOL_IDLE_CHECK_SECONDS = float(os.getenv("DB_POOL_IDLE_CHECK_SECONDS", "30"))
 
 # Initialize FastMCP server
 mcp = FastMCP(
@@ -50,31 +76,446 @@ mcp = FastMCP(
 # DATABASE CONNECTION MANAGEMENT
 # ============================================================================
 
+# Decode NUMERIC columns straight to float instead of Decimal
+NUMERIC_AS_FLOAT = psycopg2.extensions.new_type(
+    psycopg2.extensions.DECIMAL.values,
+    "NUMERIC_AS_FLOAT",
+    lambda value, cursor: float(value) if value is not None else None
+)
+psycopg2.extensions.register_type(NUMERIC_AS_FLOAT)
+
+# Parse json/jsonb columns (e.g. aggregated inventory) with orjson
+psycopg2.extras.register_default_json(globally=True, loads=orjson.loads)
+psycopg2.extras.register_default_jsonb(globally=True, loads=orjson.loads)
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """Connection that remembers which statements it has prepared and when
+    it was last handed back to the pool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+        self.last_used = time.monotonic()
+
+    def is_usable(self) -> bool:
+        """False if the connection is closed or no longer answers the server"""
+        if self.closed:
+            return False
+        if time.monotonic() - self.last_used < DB_POOL_IDLE_CHECK_SECONDS:
+            return True
+        try:
+            with self.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            self.rollback()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+        return True
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_db_pool() -> psycopg2.pool.ThreadedConnectionPool:
+    """Return the shared connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = psycopg2.pool.ThreadedConnectionPool(
+                    DB_POOL_MIN_CONN,
+                    DB_POOL_MAX_CONN,
+                    connection_factory=PooledConnection,
+                    cursor_factory=psycopg2.extras.RealDictCursor,
+                    **DB_CONNECT_KWARGS
+                )
+    return _pool
+
+
+@atexit.register
+def close_db_pool() -> None:
+    """Close every pooled connection when the server shuts down"""
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+
+
 @contextmanager
 def get_db_connection():
-    """Context manager for database connections"""
-    conn = None
+    """Context manager that borrows a connection from the shared pool.
+
+    The transaction is committed when the block exits cleanly and rolled
+    back on error, so connections always go back to the pool idle.
+    """
+    pool = get_db_pool()
+    conn = pool.getconn()
+    # Drop connections the server has closed while they sat idle; every
+    # pooled one may be stale after an outage, a new one never is
+    for _ in range(DB_POOL_MAX_CONN):
+        if conn.is_usable():
+            break
+        logger.warning("Discarding stale pooled database connection")
+        pool.putconn(conn, close=True)
+        conn = pool.getconn()
     try:
-        conn = psycopg2.connect(DB_URL)
-        conn.cursor_factory = psycopg2.extras.RealDictCursor
         yield conn
-    except psycopg2.Error as e:
-        logger.error(f"Database error: {e}")
+        conn.commit()
+    except Exception as e:
+        if isinstance(e, psycopg2.Error):
+            logger.error("Database error: %s", e)
+        if not conn.closed:
+            conn.rollback()
         raise
     finally:
-        if conn:
-            conn.close()
+        # Broken connections are discarded instead of being reused
+        conn.last_used = time.monotonic()
+        pool.putconn(conn, close=bool(conn.closed))
+
+
+# ============================================================================
+# PREPARED STATEMENTS
+# ============================================================================
+
+# Hot lookups. With DB_PREPARE_STATEMENTS=1 each one is parsed and planned
+# once per pooled connection, on first use; otherwise it is sent as a plain
+# parameterized query. Optional filters are bound as parameters so every call
+# shares a single plan.
+# Read-only lookups take flight, airline and airport columns from
+# flight_route_mv, the pre-joined route view created by create_airlines_db.py.
+# Corporate discount and preferred-vendor flags change over time, so they are
+# always read from airlines; bookings read the base tables throughout.
+
+# Flight duration in hours, rounded the same way by every tool
+DURATION_HOURS_SQL = "ROUND(duration_minutes / 60.0, 1) AS duration_hours"
+
+# Flight search; the fare breakdown is computed in the query ($6 = is_corporate)
+SEARCH_FLIGHTS_SQL = f"""
+    SELECT 
+        r.flight_id,
+        r.flight_number,
+        r.airline_name,
+        r.airline_code,
+        al.corporate_discount_percent,
+        al.is_preferred_vendor,
+        r.airline_country,
+        r.origin_code,
+        r.origin_airport,
+        r.origin_city,
+        r.origin_country,
+        r.destination_code,
+        r.destination_airport,
+        r.destination_city,
+        r.destination_country,
+        r.departure_time,
+        r.arrival_time,
+        r.duration_minutes,
+        r.aircraft_type,
+        fi.base_price,
+        fi.price_multiplier,
+        fi.available_seats,
+        fi.cabin_class,
+        {DURATION_HOURS_SQL},
+        ROUND(fi.effective_price, 2) AS dynamic_price,
+        CASE WHEN $6 THEN al.corporate_discount_percent ELSE 0 END AS applied_discount_percent,
+        ROUND(disc.discount_amount, 2) AS corporate_discount_amount,
+        ROUND(fi.effective_price - disc.discount_amount, 2) AS final_price,
+        ba.checked_bags,
+        ba.checked_bag_weight_kg,
+        ba.carry_on_bags,
+        ba.carry_on_weight_kg
+    FROM flight_route_mv r
+    JOIN airlines al ON r.airline_id = al.airline_id
+    JOIN flight_inventory fi ON r.flight_id = fi.flight_id
+    LEFT JOIN LATERAL (
+        SELECT checked_bags, checked_bag_weight_kg, carry_on_bags, carry_on_weight_kg
+        FROM baggage_allowance
+        WHERE airline_id = r.airline_id AND cabin_class = fi.cabin_class
+        LIMIT 1
+    ) ba ON TRUE
+    CROSS JOIN LATERAL (
+        SELECT CASE
+            WHEN $6 AND al.corporate_discount_percent > 0
+            THEN fi.effective_price * al.corporate_discount_percent / 100.0
+            ELSE 0
+        END AS discount_amount
+    ) disc
+    WHERE LOWER(r.origin_city) = LOWER($1)
+        AND LOWER(r.destination_city) = LOWER($2)
+        AND fi.flight_date = $3
+        AND fi.cabin_class = $4
+        AND fi.available_seats > 0
+        AND (NOT $5 OR al.is_preferred_vendor = TRUE)
+        AND ($7::numeric IS NULL OR ROUND(fi.effective_price - disc.discount_amount, 2) <= $7)
+    ORDER BY fi.effective_price - disc.discount_amount ASC
+    LIMIT $8
+"""
+
+# Flight, route and inventory for a booking; inventory columns are NULL
+# when the flight does not operate on that date and cabin
+BOOKING_FLIGHT_SQL = """
+    SELECT
+        f.*,
+        al.airline_code,
+        al.corporate_discount_percent,
+        orig.city as origin_city,
+        dest.city as destination_city,
+        fi.base_price,
+        fi.price_multiplier,
+        fi.available_seats
+    FROM flights f
+    JOIN airlines al ON f.airline_id = al.airline_id
+    JOIN airports orig ON f.origin_airport_id = orig.airport_id
+    JOIN airports dest ON f.destination_airport_id = dest.airport_id
+    LEFT JOIN LATERAL (
+        SELECT base_price, price_multiplier, available_seats
+        FROM flight_inventory
+        WHERE flight_id = f.flight_id AND flight_date = $2 AND cabin_class = $3
+    ) fi ON TRUE
+    WHERE f.flight_id = $1
+"""
+
+# Flight header plus the per-cabin inventory and baggage for one date,
+# aggregated into a single row so the tool needs one round-trip
+FLIGHT_DETAILS_SQL = f"""
+    SELECT 
+        r.*,
+        {DURATION_HOURS_SQL},
+        al.corporate_discount_percent,
+        al.is_preferred_vendor,
+        (
+            SELECT COALESCE(json_agg(json_build_object(
+                'cabin_class', fi.cabin_class,
+                'base_price', fi.base_price,
+                'price_multiplier', fi.price_multiplier,
+                'available_seats', fi.available_seats,
+                'baggage_allowance', ba.baggage
+            ) ORDER BY
+                CASE fi.cabin_class
+                    WHEN 'economy' THEN 1
+                    WHEN 'premium_economy' THEN 2
+                    WHEN 'business' THEN 3
+                    WHEN 'first' THEN 4
+                END
+            ), '[]')
+            FROM flight_inventory fi
+            LEFT JOIN LATERAL (
+                SELECT row_to_json(b) AS baggage
+                FROM baggage_allowance b
+                WHERE b.airline_id = r.airline_id AND b.cabin_class = fi.cabin_class
+                LIMIT 1
+            ) ba ON TRUE
+            WHERE fi.flight_id = r.flight_id AND fi.flight_date = $2
+        ) AS inventory
+    FROM flight_route_mv r
+    JOIN airlines al ON r.airline_id = al.airline_id
+    WHERE r.flight_id = $1
+"""
+
+BOOKING_DETAILS_SQL = f"""
+    SELECT 
+        fb.*,
+        p.first_name || ' ' || p.last_name as passenger_name,
+        p.email,
+        p.phone,
+        p.is_corporate,
+        p.company_name,
+        al.airline_name,
+        al.airline_code,
+        f.flight_number,
+        f.departure_time,
+        f.arrival_time,
+        f.duration_minutes,
+        {DURATION_HOURS_SQL},
+        f.aircraft_type,
+        orig.airport_code as origin_code,
+        orig.airport_name as origin_airport,
+        orig.city as origin_city,
+        dest.airport_code as destination_code,
+        dest.airport_name as destination_airport,
+        dest.city as destination_city
+    FROM flight_bookings fb
+    JOIN passengers p ON fb.passenger_id = p.passenger_id
+    JOIN flights f ON fb.flight_id = f.flight_id
+    JOIN airlines al ON f.airline_id = al.airline_id
+    JOIN airports orig ON f.origin_airport_id = orig.airport_id
+    JOIN airports dest ON f.destination_airport_id = dest.airport_id
+    WHERE fb.booking_reference = $1
+"""
+
+BOOKING_BAGGAGE_SQL = """
+    SELECT ba.*
+    FROM baggage_allowance ba
+    JOIN flights f ON f.airline_id = ba.airline_id
+    WHERE f.flight_id = $1 AND ba.cabin_class = $2
+"""
+
+# Baggage allowance response, assembled by the query
+BAGGAGE_ALLOWANCE_SQL = """
+    SELECT row_to_json(t) AS response
+    FROM (
+        SELECT 
+            al.airline_name,
+            al.airline_code,
+            ba.cabin_class,
+            ba.checked_bags,
+            ba.checked_bag_weight_kg,
+            ba.carry_on_bags,
+            ba.carry_on_weight_kg
+        FROM baggage_allowance ba
+        JOIN airlines al ON ba.airline_id = al.airline_id
+        WHERE al.airline_code = $1 AND ba.cabin_class = $2
+    ) t
+"""
+
+# Route options response, including the no-routes message, assembled by the
+# query. Preferred vendors and larger corporate discounts are listed first.
+ROUTE_OPTIONS_SQL = f"""
+    SELECT CASE
+        WHEN COUNT(*) = 0 THEN json_build_object(
+            'message', 'No direct flights found between ' || $1 || ' and ' || $2,
+            'routes_count', 0,
+            'routes', '[]'::json
+        )
+        ELSE json_build_object(
+            'route', $1 || ' to ' || $2,
+            'routes_count', COUNT(*),
+            'routes', json_agg(t ORDER BY
+                t.is_preferred_vendor DESC, t.corporate_discount_percent DESC, t.departure_time
+            )
+        )
+    END AS response
+    FROM (
+        SELECT DISTINCT
+            r.airline_name,
+            r.airline_code,
+            al.is_preferred_vendor,
+            al.corporate_discount_percent,
+            r.airline_country,
+            r.flight_number,
+            r.flight_id,
+            r.origin_code,
+            r.origin_airport,
+            r.destination_code,
+            r.destination_airport,
+            r.departure_time,
+            r.arrival_time,
+            r.duration_minutes,
+            r.aircraft_type,
+            {DURATION_HOURS_SQL}
+        FROM flight_route_mv r
+        JOIN airlines al ON r.airline_id = al.airline_id
+        WHERE LOWER(r.origin_city) = LOWER($1)
+            AND LOWER(r.destination_city) = LOWER($2)
+    ) t
+"""
+
+BAGGAGE_COLUMNS = ("checked_bags", "checked_bag_weight_kg", "carry_on_bags", "carry_on_weight_kg")
+
+# name -> (parameter types, statement)
+PREPARED_STATEMENTS = {
+    "search_flights": ("text, text, date, text, boolean, boolean, numeric, integer", SEARCH_FLIGHTS_SQL),
+    "booking_flight": ("integer, date, text", BOOKING_FLIGHT_SQL),
+    "flight_details": ("integer, date", FLIGHT_DETAILS_SQL),
+    "booking_details": ("text", BOOKING_DETAILS_SQL),
+    "booking_baggage": ("integer, text", BOOKING_BAGGAGE_SQL),
+    "baggage_allowance": ("text, text", BAGGAGE_ALLOWANCE_SQL),
+    "route_options": ("text, text", ROUTE_OPTIONS_SQL),
+}
+
+
+def to_plain_statement(arg_types: str, sql: str) -> str:
+    """Rewrite $n placeholders as typed, named psycopg2 parameters"""
+    types = [arg_type.strip() for arg_type in arg_types.split(",")]
+    return re.sub(
+        r"\$(\d+)",
+        lambda match: f"%(p{match.group(1)})s::{types[int(match.group(1)) - 1]}",
+        sql
+    )
+
+
+# Same statements for when server-side preparation is off
+PLAIN_STATEMENTS = {
+    name: to_plain_statement(arg_types, sql)
+    for name, (arg_types, sql) in PREPARED_STATEMENTS.items()
+}
+
+
+def execute_prepared(cursor, name: str, params: tuple) -> None:
+    """Run one of PREPARED_STATEMENTS, preparing it on first use if enabled"""
+    if not DB_PREPARE_STATEMENTS:
+        cursor.execute(PLAIN_STATEMENTS[name], {
+            f"p{position}": value for position, value in enumerate(params, start=1)
+        })
+        return
+    
+    conn = cursor.connection
+    if name not in conn.prepared_statements:
+        arg_types, sql = PREPARED_STATEMENTS[name]
+        cursor.execute(f"PREPARE {name} ({arg_types}) AS {sql}")
+        conn.prepared_statements.add(name)
+    
+    placeholders = ", ".join(["%s"] * len(params))
+    try:
+        cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+    except psycopg2.errors.InvalidSqlStatementName:
+        # The session lost the statement (e.g. a pooler switched backends);
+        # prepare it again on the next call
+        conn.prepared_statements.discard(name)
+        raise
 
 
 # ============================================================================
 # UTILITY FUNCTIONS
 # ============================================================================
 
-def generate_booking_reference(airline_code: str) -> str:
-    """Generate a unique booking reference"""
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    random_suffix = random.randint(100, 999)
-    return f"{airline_code}-{timestamp}-{random_suffix}"
+# Booking reference built in the INSERT itself: <airline>-<timestamp>-<sequence>
+BOOKING_REFERENCE_SQL = (
+    "%(airline_code)s || '-' || to_char(now(), 'YYYYMMDDHH24MISS') || '-' || "
+    "lpad(nextval('booking_ref_seq')::text, 6, '0')"
+)
+
+
+# Tool responses are compact unless MCP_PRETTY_JSON=1
+JSON_OPTIONS = orjson.OPT_INDENT_2 if os.getenv("MCP_PRETTY_JSON") == "1" else None
+
+
+def dump_json(payload) -> str:
+    """Serialize a tool response to a JSON string"""
+    return orjson.dumps(payload, default=str, option=JSON_OPTIONS).decode()
+
+
+# Seat map shared by every cabin: rows 1-40, seats A-F
+SEAT_ROWS = 40
+SEAT_LETTERS = "ABCDEF"
+SEAT_MAP = tuple(f"{row}{letter}" for row in range(1, SEAT_ROWS + 1) for letter in SEAT_LETTERS)
+# The same seat map generated in SQL, as a seat_number column
+SEAT_MAP_SQL = (
+    "SELECT seat_row || seat_letter AS seat_number "
+    f"FROM generate_series(1, {SEAT_ROWS}) AS seat_row, "
+    f"regexp_split_to_table('{SEAT_LETTERS}', '') AS seat_letter"
+)
+_seat_random = secrets.SystemRandom()
+
+
+def split_passenger_name(passenger_name: str) -> tuple:
+    """Split a full name into first and last name"""
+    name_parts = passenger_name.strip().split(' ', 1)
+    return name_parts[0], name_parts[1] if len(name_parts) > 1 else ""
+
+
+def generate_passenger_code(passenger_email: str, is_corporate: bool) -> str:
+    """Passenger code derived from the email, prefixed by passenger type"""
+    email_hash = hashlib.blake2b(passenger_email.lower().encode(), digest_size=5).hexdigest()
+    return f"{'CORP' if is_corporate else 'INDV'}{email_hash.upper()}"
+
+
+CENT = Decimal("0.01")
+
+
+def round_money(amount: Decimal) -> float:
+    """Round to cents half away from zero, the same as ROUND(numeric, 2) in Postgres"""
+    return float(amount.quantize(CENT, rounding=ROUND_HALF_UP))
 
 
 def calculate_flight_price(
@@ -84,25 +525,108 @@ def calculate_flight_price(
     corporate_discount_percent: float
 ) -> dict:
     """Calculate final flight price with corporate discount"""
+    # Work on the exact NUMERIC values so prices match the ones search_flights
+    # computes in SQL
+    base_price = Decimal(str(base_price))
+    
     # Apply dynamic pricing multiplier
-    dynamic_price = base_price * price_multiplier
+    dynamic_price = base_price * Decimal(str(price_multiplier))
     
     # Apply corporate discount
-    discount_amount = 0
+    discount_amount = Decimal(0)
     if is_corporate and corporate_discount_percent > 0:
-        discount_amount = dynamic_price * (corporate_discount_percent / 100)
+        discount_amount = dynamic_price * Decimal(str(corporate_discount_percent)) / 100
     
     final_price = dynamic_price - discount_amount
     
     return {
-        "base_price": round(float(base_price), 2),
-        "dynamic_price": round(float(dynamic_price), 2),
-        "corporate_discount_percent": float(corporate_discount_percent) if is_corporate else 0,
-        "corporate_discount_amount": round(float(discount_amount), 2),
-        "final_price": round(float(final_price), 2)
+        "base_price": round_money(base_price),
+        "dynamic_price": round_money(dynamic_price),
+        "corporate_discount_percent": corporate_discount_percent if is_corporate else 0,
+        "corporate_discount_amount": round_money(discount_amount),
+        "final_price": round_money(final_price)
     }
 
 
+# ============================================================================
+# CATALOG LOOKUPS
+# ============================================================================
+
+# Airlines and airports rarely change, so listings are served from an
+# in-process cache instead of hitting the database on every call
+CATALOG_CACHE_TTL_SECONDS = 300
+_catalog_cache = TTLCache(maxsize=256, ttl=CATALOG_CACHE_TTL_SECONDS)
+_catalog_cache_lock = threading.Lock()
+
+
+@cached(_catalog_cache, key=partial(hashkey, "airlines"), lock=_catalog_cache_lock)
+def fetch_airlines(country: Optional[str] = None) -> list:
+    """Airlines, optionally filtered by country"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        if country:
+            cursor.execute("""
+                SELECT 
+                    airline_id,
+                    airline_code,
+                    airline_name,
+                    country,
+                    corporate_discount_percent,
+                    is_preferred_vendor,
+                    hub_airport
+                FROM airlines
+                WHERE LOWER(country) = LOWER(%s)
+                ORDER BY airline_name
+            """, (country,))
+        else:
+            cursor.execute("""
+                SELECT 
+                    airline_id,
+                    airline_code,
+                    airline_name,
+                    country,
+                    corporate_discount_percent,
+                    is_preferred_vendor,
+                    hub_airport
+                FROM airlines
+                ORDER BY airline_name
+            """)
+        
+        return cursor.fetchall()
+
+
+@cached(_catalog_cache, key=partial(hashkey, "airports"), lock=_catalog_cache_lock)
+def fetch_airports(city: Optional[str] = None, country: Optional[str] = None) -> list:
+    """Airports filtered by city or country, or a city summary if neither is given"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        if city:
+            cursor.execute("""
+                SELECT *
+                FROM airports
+                WHERE LOWER(city) = LOWER(%s)
+                ORDER BY airport_name
+            """, (city,))
+        elif country:
+            cursor.execute("""
+                SELECT *
+                FROM airports
+                WHERE LOWER(country) = LOWER(%s)
+                ORDER BY city, airport_name
+            """, (country,))
+        else:
+            cursor.execute("""
+                SELECT DISTINCT city, state, country, COUNT(airport_id) as airport_count
+                FROM airports
+                GROUP BY city, state, country
+                ORDER BY city
+            """)
+        
+        return cursor.fetchall()
+
+
 # ============================================================================
 # TOOL IMPLEMENTATIONS
 # ============================================================================
@@ -115,7 +639,8 @@ def search_flights(
     cabin_class: str = "economy",
     is_corporate: bool = False,
     preferred_airlines_only: bool = False,
-    max_price: Optional[float] = None
+    max_price: Optional[float] = None,
+    limit: int = 50
 ) -> str:
     """Search for flights between two cities on a specific date.
     
@@ -127,97 +652,38 @@ def search_flights(
         is_corporate: Is this a corporate booking? (default: False)
         preferred_airlines_only: Show only preferred vendor airlines
         max_price: Maximum ticket price
+        limit: Maximum number of flights to return, cheapest first (default 50, max 200)
     
     Returns:
         JSON string with available flights and pricing
     """
+    limit = max(1, min(limit, 200))
+    
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
-        # Build flight search query
-        query = """
-            SELECT 
-                f.flight_id,
-                f.flight_number,
-                al.airline_name,
-                al.airline_code,
-                al.corporate_discount_percent,
-                al.is_preferred_vendor,
-                al.country as airline_country,
-                orig.airport_code as origin_code,
-                orig.airport_name as origin_airport,
-                orig.city as origin_city,
-                orig.country as origin_country,
-                dest.airport_code as destination_code,
-                dest.airport_name as destination_airport,
-                dest.city as destination_city,
-                dest.country as destination_country,
-                f.departure_time,
-                f.arrival_time,
-                f.duration_minutes,
-                f.aircraft_type,
-                fi.base_price,
-                fi.price_multiplier,
-                fi.available_seats,
-                fi.cabin_class
-            FROM flights f
-            JOIN airlines al ON f.airline_id = al.airline_id
-            JOIN airports orig ON f.origin_airport_id = orig.airport_id
-            JOIN airports dest ON f.destination_airport_id = dest.airport_id
-            JOIN flight_inventory fi ON f.flight_id = fi.flight_id
-            WHERE LOWER(orig.city) = LOWER(%s)
-                AND LOWER(dest.city) = LOWER(%s)
-                AND fi.flight_date = %s
-                AND fi.cabin_class = %s
-                AND fi.available_seats > 0
-        """
-        params = [origin_city, destination_city, travel_date, cabin_class]
-        
-        if preferred_airlines_only:
-            query += " AND al.is_preferred_vendor = TRUE"
-        
-        query += " ORDER BY fi.base_price * fi.price_multiplier ASC"
-        
-        cursor.execute(query, params)
+        execute_prepared(cursor, "search_flights", (
+            origin_city, destination_city, travel_date, cabin_class,
+            preferred_airlines_only, is_corporate, max_price, limit
+        ))
         flights = cursor.fetchall()
         
-        results = []
         for flight in flights:
-            flight_dict = dict(flight)
-            
-            # Calculate final pricing
-            pricing = calculate_flight_price(
-                flight["base_price"],
-                flight["price_multiplier"],
-                is_corporate,
-                flight["corporate_discount_percent"]
-            )
-            
-            # Filter by max_price if specified
-            if max_price is not None and pricing["final_price"] > max_price:
-                continue
-            
-            flight_dict.update({
-                "pricing": pricing,
-                "available_seats": flight["available_seats"],
-                "duration_hours": round(flight["duration_minutes"] / 60, 1)
-            })
+            # Final pricing is computed by the query
+            flight["pricing"] = {
+                "base_price": flight["base_price"],
+                "dynamic_price": flight.pop("dynamic_price"),
+                "corporate_discount_percent": flight.pop("applied_discount_percent"),
+                "corporate_discount_amount": flight.pop("corporate_discount_amount"),
+                "final_price": flight.pop("final_price")
+            }
             
-            # Get baggage allowance
-            cursor.execute("""
-                SELECT checked_bags, checked_bag_weight_kg, carry_on_bags, carry_on_weight_kg
-                FROM baggage_allowance
-                WHERE airline_id = (SELECT airline_id FROM flights WHERE flight_id = %s)
-                    AND cabin_class = %s
-            """, (flight["flight_id"], cabin_class))
-            
-            baggage = cursor.fetchone()
-            if baggage:
-                flight_dict["baggage_allowance"] = dict(baggage)
-            
-            results.append(flight_dict)
+            # Baggage allowance comes back joined onto the flight row
+            baggage = {column: flight.pop(column) for column in BAGGAGE_COLUMNS}
+            if baggage["checked_bags"] is not None:
+                flight["baggage_allowance"] = baggage
     
-    return json.dumps({
+    return dump_json({
         "search_criteria": {
             "origin_city": origin_city,
             "destination_city": destination_city,
@@ -226,9 +692,9 @@ def search_flights(
             "is_corporate_booking": is_corporate,
             "preferred_only": preferred_airlines_only
         },
-        "results_count": len(results),
-        "flights": results
-    }, indent=2, default=str)
+        "results_count": len(flights),
+        "flights": flights
+    })
 
 
 @mcp.tool
@@ -252,54 +718,14 @@ def get_flight_details(
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
-        # Get flight details
-        cursor.execute("""
-            SELECT 
-                f.*,
-                al.airline_name,
-                al.airline_code,
-                al.corporate_discount_percent,
-                al.is_preferred_vendor,
-                al.hub_airport,
-                al.country as airline_country,
-                orig.airport_code as origin_code,
-                orig.airport_name as origin_airport,
-                orig.city as origin_city,
-                orig.state as origin_state,
-                orig.country as origin_country,
-                dest.airport_code as destination_code,
-                dest.airport_name as destination_airport,
-                dest.city as destination_city,
-                dest.state as destination_state,
-                dest.country as destination_country
-            FROM flights f
-            JOIN airlines al ON f.airline_id = al.airline_id
-            JOIN airports orig ON f.origin_airport_id = orig.airport_id
-            JOIN airports dest ON f.destination_airport_id = dest.airport_id
-            WHERE f.flight_id = %s
-        """, (flight_id,))
+        # Get flight details with inventory and baggage for the date
+        execute_prepared(cursor, "flight_details", (flight_id, travel_date))
         
         flight = cursor.fetchone()
         if not flight:
             raise ValueError("Flight not found")
         
-        flight_dict = dict(flight)
-        
-        # Get inventory for this flight and date
-        cursor.execute("""
-            SELECT cabin_class, base_price, price_multiplier, available_seats
-            FROM flight_inventory
-            WHERE flight_id = %s AND flight_date = %s
-            ORDER BY 
-                CASE cabin_class
-                    WHEN 'economy' THEN 1
-                    WHEN 'premium_economy' THEN 2
-                    WHEN 'business' THEN 3
-                    WHEN 'first' THEN 4
-                END
-        """, (flight_id, travel_date))
-        
-        inventory = cursor.fetchall()
+        inventory = flight.pop("inventory")
         cabin_availability = []
         
         for inv in inventory:
@@ -310,27 +736,18 @@ def get_flight_details(
                 flight["corporate_discount_percent"]
             )
             
-            # Get baggage for this cabin
-            cursor.execute("""
-                SELECT * FROM baggage_allowance
-                WHERE airline_id = %s AND cabin_class = %s
-            """, (flight["airline_id"], inv["cabin_class"]))
-            
-            baggage = cursor.fetchone()
-            
             cabin_availability.append({
                 "cabin_class": inv["cabin_class"],
                 "available_seats": inv["available_seats"],
                 "pricing": pricing,
-                "baggage_allowance": dict(baggage) if baggage else None
+                "baggage_allowance": inv["baggage_allowance"]
             })
         
-        flight_dict["travel_date"] = travel_date
-        flight_dict["cabin_availability"] = cabin_availability
-        flight_dict["duration_hours"] = round(flight["duration_minutes"] / 60, 1)
-        flight_dict["pricing_is_corporate"] = is_corporate
+        flight["travel_date"] = travel_date
+        flight["cabin_availability"] = cabin_availability
+        flight["pricing_is_corporate"] = is_corporate
     
-    return json.dumps(flight_dict, indent=2, default=str)
+    return dump_json(flight)
 
 
 @mcp.tool
@@ -355,20 +772,17 @@ def check_seat_availability(
         # Get flight and inventory info
         cursor.execute("""
             SELECT 
-                f.flight_number,
-                al.airline_name,
-                al.airline_code,
-                orig.city as origin_city,
-                dest.city as destination_city,
+                r.flight_number,
+                r.airline_name,
+                r.airline_code,
+                r.origin_city,
+                r.destination_city,
                 fi.available_seats,
                 fi.base_price,
                 fi.price_multiplier
-            FROM flights f
-            JOIN airlines al ON f.airline_id = al.airline_id
-            JOIN airports orig ON f.origin_airport_id = orig.airport_id
-            JOIN airports dest ON f.destination_airport_id = dest.airport_id
-            JOIN flight_inventory fi ON f.flight_id = fi.flight_id
-            WHERE f.flight_id = %s
+            FROM flight_route_mv r
+            JOIN flight_inventory fi ON r.flight_id = fi.flight_id
+            WHERE r.flight_id = %s
                 AND fi.flight_date = %s
                 AND fi.cabin_class = %s
         """, (flight_id, travel_date, cabin_class))
@@ -377,7 +791,7 @@ def check_seat_availability(
         if not result:
             raise ValueError("Flight not found for the specified date and cabin class")
         
-        return json.dumps({
+        return dump_json({
             "flight_id": flight_id,
             "airline": result["airline_name"],
             "flight_number": result["flight_number"],
@@ -386,8 +800,10 @@ def check_seat_availability(
             "cabin_class": cabin_class,
             "available_seats": result["available_seats"],
             "is_available": result["available_seats"] > 0,
-            "current_price": round(float(result["base_price"]) * float(result["price_multiplier"]), 2)
-        }, indent=2, default=str)
+            "current_price": calculate_flight_price(
+                result["base_price"], result["price_multiplier"], False, 0
+            )["dynamic_price"]
+        })
 
 
 @mcp.tool
@@ -421,141 +837,341 @@ def create_flight_booking(
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
-        try:
-            # Get or create passenger
-            cursor.execute("""
-                SELECT passenger_id FROM passengers WHERE LOWER(email) = LOWER(%s)
-            """, (passenger_email,))
-            
-            passenger = cursor.fetchone()
-            
-            if passenger:
-                passenger_id = passenger["passenger_id"]
-            else:
-                # Create new passenger record
-                name_parts = passenger_name.strip().split(' ', 1)
-                first_name = name_parts[0]
-                last_name = name_parts[1] if len(name_parts) > 1 else ""
-                
-                # Generate passenger code
-                passenger_code = f"{'CORP' if is_corporate else 'INDV'}{random.randint(1000, 9999)}"
-                
-                cursor.execute("""
-                    INSERT INTO passengers (
-                        passenger_code, first_name, last_name, email,
-                        is_corporate, company_name
-                    ) VALUES (%s, %s, %s, %s, %s, %s)
-                    RETURNING passenger_id
-                """, (passenger_code, first_name, last_name, passenger_email,
-                      is_corporate, company_name))
-                
-                passenger_id = cursor.fetchone()["passenger_id"]
-            
-            # Get flight and airline info
-            cursor.execute("""
-                SELECT f.*, al.airline_code, al.corporate_discount_percent
-                FROM flights f
-                JOIN airlines al ON f.airline_id = al.airline_id
-                WHERE f.flight_id = %s
-            """, (flight_id,))
-            
-            flight = cursor.fetchone()
+        # Get or create passenger in one statement. The no-op update makes an
+        # existing passenger show up in RETURNING; the code is derived from the
+        # email so retries produce the same row.
+        first_name, last_name = split_passenger_name(passenger_name)
+        cursor.execute("""
+            INSERT INTO passengers (
+                passenger_code, first_name, last_name, email,
+                is_corporate, company_name
+            ) VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT ((LOWER(email))) DO UPDATE SET email = passengers.email
+            RETURNING passenger_id
+        """, (generate_passenger_code(passenger_email, is_corporate), first_name,
+              last_name, passenger_email, is_corporate, company_name))
+        
+        passenger_id = cursor.fetchone()["passenger_id"]
+        
+        # Get flight, route, pricing and availability in one query
+        execute_prepared(cursor, "booking_flight", (flight_id, travel_date, cabin_class))
+        
+        flight = cursor.fetchone()
+        if not flight:
+            raise ValueError("Flight not found")
+        
+        if flight["available_seats"] is None:
+            raise ValueError("No inventory found for this flight and date")
+        
+        if flight["available_seats"] < 1:
+            raise ValueError("No seats available for this flight")
+        
+        # Calculate pricing
+        pricing = calculate_flight_price(
+            flight["base_price"],
+            flight["price_multiplier"],
+            is_corporate,
+            flight["corporate_discount_percent"]
+        )
+        
+        # Take the seat first. The decrement only matches while a seat is
+        # left, so concurrent bookings cannot oversell, and it locks the
+        # inventory row until commit, so bookings for the same flight, date
+        # and cabin queue up here.
+        cursor.execute("""
+            UPDATE flight_inventory
+            SET available_seats = available_seats - 1
+            WHERE flight_id = %s
+                AND flight_date = %s
+                AND cabin_class = %s
+                AND available_seats > 0
+        """, (flight_id, travel_date, cabin_class))
+        if cursor.rowcount == 0:
+            raise ValueError("No seats available for this flight")
+        
+        # Create the booking in a separate statement: it takes a new snapshot
+        # once the lock is held, so seats confirmed by the booking we waited
+        # for are already visible. A random seat not held by another confirmed
+        # booking is picked from SEAT_MAP (left empty if none is free), and
+        # the reference is generated by the database.
+        cursor.execute(f"""
+            WITH free_seat AS (
+                SELECT s.seat_number
+                FROM ({SEAT_MAP_SQL}) AS s
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM flight_bookings fb
+                    WHERE fb.flight_id = %(flight_id)s
+                        AND fb.flight_date = %(travel_date)s
+                        AND fb.cabin_class = %(cabin_class)s
+                        AND fb.booking_status = 'confirmed'
+                        AND fb.seat_number = s.seat_number
+                )
+                ORDER BY random()
+                LIMIT 1
+            )
+            INSERT INTO flight_bookings (
+                booking_reference, passenger_id, flight_id, flight_date,
+                cabin_class, seat_number, ticket_price, corporate_discount,
+                checked_bags, booking_status, purpose_of_travel
+            )
+            SELECT
+                {BOOKING_REFERENCE_SQL}, %(passenger_id)s, %(flight_id)s,
+                %(travel_date)s, %(cabin_class)s, free_seat.seat_number,
+                %(ticket_price)s, %(corporate_discount)s, %(checked_bags)s,
+                'confirmed', %(purpose_of_travel)s
+            FROM (SELECT 1) AS booking
+            LEFT JOIN free_seat ON TRUE
+            RETURNING booking_reference, seat_number
+        """, {
+            "flight_id": flight_id,
+            "travel_date": travel_date,
+            "cabin_class": cabin_class,
+            "airline_code": flight["airline_code"],
+            "passenger_id": passenger_id,
+            "ticket_price": pricing["final_price"],
+            "corporate_discount": pricing["corporate_discount_amount"],
+            "checked_bags": checked_bags,
+            "purpose_of_travel": purpose_of_travel or ""
+        })
+        booking = cursor.fetchone()
+        booking_ref = booking["booking_reference"]
+        seat_number = booking["seat_number"]
+        
+        return dump_json({
+            "success": True,
+            "booking_reference": booking_ref,
+            "status": "confirmed",
+            "details": {
+                "passenger_name": passenger_name,
+                "passenger_email": passenger_email,
+                "is_corporate": is_corporate,
+                "company": company_name,
+                "flight_number": flight["flight_number"],
+                "route": f"{flight['origin_city']} to {flight['destination_city']}",
+                "travel_date": travel_date,
+                "departure_time": str(flight["departure_time"]),
+                "cabin_class": cabin_class,
+                "seat_number": seat_number,
+                "ticket_price": pricing["final_price"],
+                "corporate_discount": pricing["corporate_discount_amount"],
+                "checked_bags": checked_bags,
+                "purpose": purpose_of_travel or ""
+            },
+            "message": "Flight booking confirmed successfully"
+        })
+
+
+@mcp.tool
+def create_flight_bookings_bulk(bookings: list[dict]) -> str:
+    """Create several flight bookings at once, e.g. for a corporate group.
+    All bookings are confirmed together or none are.
+    
+    Args:
+        bookings: List of bookings, each with the fields of create_flight_booking:
+            flight_id, travel_date, passenger_name and passenger_email (required),
+            cabin_class, is_corporate, company_name, checked_bags and
+            purpose_of_travel (optional)
+    
+    Returns:
+        JSON string with the confirmation of every booking
+    """
+    if not bookings:
+        raise ValueError("No bookings provided")
+    
+    requests = []
+    for index, booking in enumerate(bookings, start=1):
+        missing = [
+            field for field in ("flight_id", "travel_date", "passenger_name", "passenger_email")
+            if not booking.get(field)
+        ]
+        if missing:
+            raise ValueError(f"Booking {index} is missing {', '.join(missing)}")
+        requests.append({
+            "flight_id": int(booking["flight_id"]),
+            "travel_date": date.fromisoformat(str(booking["travel_date"])),
+            "passenger_name": booking["passenger_name"],
+            "passenger_email": booking["passenger_email"],
+            "cabin_class": booking.get("cabin_class") or "economy",
+            "is_corporate": bool(booking.get("is_corporate", False)),
+            "company_name": booking.get("company_name"),
+            "checked_bags": int(booking.get("checked_bags") or 0),
+            "purpose_of_travel": booking.get("purpose_of_travel") or ""
+        })
+    
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Get or create every passenger in one statement. The no-op update
+        # makes existing passengers show up in RETURNING too.
+        new_passengers = {}
+        for request in requests:
+            email_key = request["passenger_email"].lower()
+            if email_key not in new_passengers:
+                first_name, last_name = split_passenger_name(request["passenger_name"])
+                new_passengers[email_key] = (
+                    generate_passenger_code(email_key, request["is_corporate"]), first_name,
+                    last_name, request["passenger_email"], request["is_corporate"],
+                    request["company_name"]
+                )
+        
+        passengers = psycopg2.extras.execute_values(cursor, """
+            INSERT INTO passengers (
+                passenger_code, first_name, last_name, email,
+                is_corporate, company_name
+            ) VALUES %s
+            ON CONFLICT ((LOWER(email))) DO UPDATE SET email = passengers.email
+            RETURNING passenger_id, LOWER(email) AS email_key
+        """, list(new_passengers.values()), fetch=True)
+        passenger_ids = {row["email_key"]: row["passenger_id"] for row in passengers}
+        
+        # Get flight, route, pricing and availability for every
+        # flight/date/cabin in one query
+        seats_needed = Counter(
+            (request["flight_id"], request["travel_date"], request["cabin_class"])
+            for request in requests
+        )
+        flights = psycopg2.extras.execute_values(cursor, """
+            SELECT
+                req.flight_id, req.flight_date, req.cabin_class,
+                f.flight_number, al.airline_code, al.corporate_discount_percent,
+                orig.city as origin_city, dest.city as destination_city,
+                fi.base_price, fi.price_multiplier, fi.available_seats
+            FROM (VALUES %s) AS req (flight_id, flight_date, cabin_class)
+            JOIN flights f ON req.flight_id = f.flight_id
+            JOIN airlines al ON f.airline_id = al.airline_id
+            JOIN airports orig ON f.origin_airport_id = orig.airport_id
+            JOIN airports dest ON f.destination_airport_id = dest.airport_id
+            LEFT JOIN flight_inventory fi ON fi.flight_id = req.flight_id
+                AND fi.flight_date = req.flight_date
+                AND fi.cabin_class = req.cabin_class
+        """, list(seats_needed), template="(%s, %s::date, %s)", fetch=True)
+        flights = {
+            (row["flight_id"], row["flight_date"], row["cabin_class"]): row
+            for row in flights
+        }
+        
+        # Check availability for each flight
+        for key, count in seats_needed.items():
+            flight_id, travel_date, cabin_class = key
+            flight = flights.get(key)
             if not flight:
-                raise ValueError("Flight not found")
-            
-            # Check availability and get pricing
-            cursor.execute("""
-                SELECT base_price, price_multiplier, available_seats
-                FROM flight_inventory
-                WHERE flight_id = %s
-                    AND flight_date = %s
-                    AND cabin_class = %s
-            """, (flight_id, travel_date, cabin_class))
+                raise ValueError(f"Flight {flight_id} not found")
             
-            inventory = cursor.fetchone()
-            if not inventory:
-                raise ValueError("No inventory found for this flight and date")
+            if flight["available_seats"] is None:
+                raise ValueError(
+                    f"No inventory found for flight {flight_id} on {travel_date} ({cabin_class})"
+                )
             
-            if inventory["available_seats"] < 1:
-                raise ValueError("No seats available for this flight")
-            
-            # Calculate pricing
+            if flight["available_seats"] < count:
+                raise ValueError(
+                    f"Only {flight['available_seats']} seats available on flight "
+                    f"{flight['flight_number']} on {travel_date} ({cabin_class})"
+                )
+        
+        # Take all seats in one statement; it only matches inventory rows
+        # that still have enough seats left, so concurrent bookings cannot
+        # oversell. The rows stay locked until commit.
+        updated = psycopg2.extras.execute_values(cursor, """
+            UPDATE flight_inventory fi
+            SET available_seats = fi.available_seats - req.seats
+            FROM (VALUES %s) AS req (flight_id, flight_date, cabin_class, seats)
+            WHERE fi.flight_id = req.flight_id
+                AND fi.flight_date = req.flight_date
+                AND fi.cabin_class = req.cabin_class
+                AND fi.available_seats >= req.seats
+            RETURNING fi.inventory_id
+        """, [key + (count,) for key, count in seats_needed.items()],
+            template="(%s, %s::date, %s, %s)", fetch=True)
+        if len(updated) != len(seats_needed):
+            raise ValueError("Seats sold out while booking, no bookings were made")
+        
+        # Read the taken seats only now that the inventory rows are locked, so
+        # seats from bookings that committed while we waited are included
+        taken_seats = psycopg2.extras.execute_values(cursor, """
+            SELECT req.flight_id, req.flight_date, req.cabin_class, fb.seat_number
+            FROM (VALUES %s) AS req (flight_id, flight_date, cabin_class)
+            JOIN flight_bookings fb ON fb.flight_id = req.flight_id
+                AND fb.flight_date = req.flight_date
+                AND fb.cabin_class = req.cabin_class
+            WHERE fb.booking_status = 'confirmed' AND fb.seat_number IS NOT NULL
+        """, list(seats_needed), template="(%s, %s::date, %s)", fetch=True)
+        taken = {key: set() for key in seats_needed}
+        for row in taken_seats:
+            taken[(row["flight_id"], row["flight_date"], row["cabin_class"])].add(row["seat_number"])
+        
+        # Pick random free seats for each flight
+        free_seats = {}
+        for key, count in seats_needed.items():
+            free = [seat for seat in SEAT_MAP if seat not in taken[key]]
+            seats = _seat_random.sample(free, min(count, len(free)))
+            free_seats[key] = seats + [None] * (count - len(seats))
+        
+        # Create all bookings in one statement
+        booking_rows = []
+        for request in requests:
+            key = (request["flight_id"], request["travel_date"], request["cabin_class"])
+            flight = flights[key]
             pricing = calculate_flight_price(
-                inventory["base_price"],
-                inventory["price_multiplier"],
-                is_corporate,
+                flight["base_price"],
+                flight["price_multiplier"],
+                request["is_corporate"],
                 flight["corporate_discount_percent"]
             )
-            
-            # Generate seat number (simplified - random assignment)
-            seat_row = random.randint(1, 40)
-            seat_letter = random.choice(['A', 'B', 'C', 'D', 'E', 'F'])
-            seat_number = f"{seat_row}{seat_letter}"
-            
-            # Generate booking reference
-            booking_ref = generate_booking_reference(flight["airline_code"])
-            
-            # Create booking
-            cursor.execute("""
-                INSERT INTO flight_bookings (
-                    booking_reference, passenger_id, flight_id, flight_date,
-                    cabin_class, seat_number, ticket_price, corporate_discount,
-                    checked_bags, booking_status, purpose_of_travel
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                booking_ref, passenger_id, flight_id, travel_date,
-                cabin_class, seat_number, pricing["final_price"],
-                pricing["corporate_discount_amount"],
-                checked_bags, "confirmed", purpose_of_travel or ""
-            ))
-            
-            # Update inventory
-            cursor.execute("""
-                UPDATE flight_inventory
-                SET available_seats = available_seats - 1
-                WHERE flight_id = %s
-                    AND flight_date = %s
-                    AND cabin_class = %s
-            """, (flight_id, travel_date, cabin_class))
-            
-            conn.commit()
-            
-            # Get route details for response
-            cursor.execute("""
-                SELECT orig.city as origin, dest.city as destination
-                FROM flights f
-                JOIN airports orig ON f.origin_airport_id = orig.airport_id
-                JOIN airports dest ON f.destination_airport_id = dest.airport_id
-                WHERE f.flight_id = %s
-            """, (flight_id,))
-            route = cursor.fetchone()
-            
-            return json.dumps({
-                "success": True,
-                "booking_reference": booking_ref,
-                "status": "confirmed",
-                "details": {
-                    "passenger_name": passenger_name,
-                    "passenger_email": passenger_email,
-                    "is_corporate": is_corporate,
-                    "company": company_name,
-                    "flight_number": flight["flight_number"],
-                    "route": f"{route['origin']} to {route['destination']}",
-                    "travel_date": travel_date,
-                    "departure_time": str(flight["departure_time"]),
-                    "cabin_class": cabin_class,
-                    "seat_number": seat_number,
-                    "ticket_price": pricing["final_price"],
-                    "corporate_discount": pricing["corporate_discount_amount"],
-                    "checked_bags": checked_bags,
-                    "purpose": purpose_of_travel or ""
-                },
-                "message": "Flight booking confirmed successfully"
-            }, indent=2, default=str)
-        
-        except Exception as e:
-            conn.rollback()
-            raise
+            booking_rows.append({
+                "airline_code": flight["airline_code"],
+                "passenger_id": passenger_ids[request["passenger_email"].lower()],
+                "flight_id": request["flight_id"],
+                "travel_date": request["travel_date"],
+                "cabin_class": request["cabin_class"],
+                "seat_number": free_seats[key].pop(),
+                "ticket_price": pricing["final_price"],
+                "corporate_discount": pricing["corporate_discount_amount"],
+                "checked_bags": request["checked_bags"],
+                "purpose_of_travel": request["purpose_of_travel"]
+            })
+        
+        created = psycopg2.extras.execute_values(cursor, """
+            INSERT INTO flight_bookings (
+                booking_reference, passenger_id, flight_id, flight_date,
+                cabin_class, seat_number, ticket_price, corporate_discount,
+                checked_bags, booking_status, purpose_of_travel
+            ) VALUES %s
+            RETURNING
+                booking_reference, passenger_id, flight_id, flight_date,
+                cabin_class, seat_number, ticket_price, corporate_discount
+        """, booking_rows, template=f"""(
+            {BOOKING_REFERENCE_SQL}, %(passenger_id)s, %(flight_id)s,
+            %(travel_date)s, %(cabin_class)s, %(seat_number)s, %(ticket_price)s,
+            %(corporate_discount)s, %(checked_bags)s, 'confirmed',
+            %(purpose_of_travel)s
+        )""", fetch=True)
+        
+        passenger_emails = {
+            passenger_ids[email_key]: values[3]
+            for email_key, values in new_passengers.items()
+        }
+        confirmations = []
+        for booking in created:
+            flight = flights[(booking["flight_id"], booking["flight_date"], booking["cabin_class"])]
+            confirmations.append({
+                "booking_reference": booking["booking_reference"],
+                "passenger_email": passenger_emails[booking["passenger_id"]],
+                "flight_number": flight["flight_number"],
+                "route": f"{flight['origin_city']} to {flight['destination_city']}",
+                "travel_date": booking["flight_date"],
+                "cabin_class": booking["cabin_class"],
+                "seat_number": booking["seat_number"],
+                "ticket_price": booking["ticket_price"],
+                "corporate_discount": booking["corporate_discount"]
+            })
+        
+        return dump_json({
+            "success": True,
+            "status": "confirmed",
+            "bookings_count": len(confirmations),
+            "bookings": confirmations,
+            "message": f"{len(confirmations)} flight bookings confirmed successfully"
+        })
 
 
 @mcp.tool
@@ -571,74 +1187,46 @@ def get_booking_details(booking_reference: str) -> str:
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT 
-                fb.*,
-                p.first_name || ' ' || p.last_name as passenger_name,
-                p.email,
-                p.phone,
-                p.is_corporate,
-                p.company_name,
-                al.airline_name,
-                al.airline_code,
-                f.flight_number,
-                f.departure_time,
-                f.arrival_time,
-                f.duration_minutes,
-                f.aircraft_type,
-                orig.airport_code as origin_code,
-                orig.airport_name as origin_airport,
-                orig.city as origin_city,
-                dest.airport_code as destination_code,
-                dest.airport_name as destination_airport,
-                dest.city as destination_city
-            FROM flight_bookings fb
-            JOIN passengers p ON fb.passenger_id = p.passenger_id
-            JOIN flights f ON fb.flight_id = f.flight_id
-            JOIN airlines al ON f.airline_id = al.airline_id
-            JOIN airports orig ON f.origin_airport_id = orig.airport_id
-            JOIN airports dest ON f.destination_airport_id = dest.airport_id
-            WHERE fb.booking_reference = %s
-        """, (booking_reference,))
+        execute_prepared(cursor, "booking_details", (booking_reference,))
         
         booking = cursor.fetchone()
         if not booking:
             raise ValueError("Booking not found")
         
-        booking_dict = dict(booking)
-        booking_dict["duration_hours"] = round(booking["duration_minutes"] / 60, 1)
-        
         # Get baggage allowance for this booking
-        cursor.execute("""
-            SELECT ba.*
-            FROM baggage_allowance ba
-            JOIN flights f ON f.airline_id = ba.airline_id
-            WHERE f.flight_id = %s AND ba.cabin_class = %s
-        """, (booking["flight_id"], booking["cabin_class"]))
+        execute_prepared(cursor, "booking_baggage", (booking["flight_id"], booking["cabin_class"]))
         
         baggage = cursor.fetchone()
         if baggage:
-            booking_dict["baggage_allowance"] = dict(baggage)
+            booking["baggage_allowance"] = baggage
         
-        return json.dumps(booking_dict, indent=2, default=str)
+        return dump_json(booking)
 
 
 @mcp.tool
 def list_bookings_by_email(
     passenger_email: str,
     status: Optional[str] = None,
-    include_past: bool = False
+    include_past: bool = False,
+    page_size: int = 50,
+    page_cursor: Optional[str] = None
 ) -> str:
     """List all flight bookings for a passenger by their email.
     
+    Results are paged, newest flight date first. Pass the returned
+    next_cursor as page_cursor to fetch the following page.
+    
     Args:
         passenger_email: Passenger's email address
         status: Filter by status (confirmed, cancelled, completed)
         include_past: Include past flights (default false)
+        page_size: Maximum bookings per page (default 50, max 200)
+        page_cursor: next_cursor value from the previous page (optional)
     
     Returns:
         JSON string with list of bookings
     """
+    page_size = max(1, min(page_size, 200))
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
@@ -649,16 +1237,17 @@ def list_bookings_by_email(
         
         passenger = cursor.fetchone()
         if not passenger:
-            return json.dumps({
+            return dump_json({
                 "message": "No bookings found for this email address",
                 "bookings_count": 0,
                 "bookings": []
-            }, indent=2)
+            })
         
         passenger_id = passenger["passenger_id"]
         
         query = """
             SELECT 
+                fb.booking_id,
                 fb.booking_reference,
                 fb.booking_status,
                 fb.flight_date,
@@ -688,19 +1277,38 @@ def list_bookings_by_email(
         if not include_past:
             query += " AND fb.flight_date >= CURRENT_DATE"
         
-        query += " ORDER BY fb.flight_date DESC"
+        if page_cursor:
+            last_date, _, last_booking_id = page_cursor.partition(":")
+            try:
+                last_date = date.fromisoformat(last_date)
+                last_booking_id = int(last_booking_id)
+            except ValueError:
+                raise ValueError("Invalid page cursor") from None
+            query += " AND (fb.flight_date, fb.booking_id) < (%s, %s)"
+            params.extend([last_date, last_booking_id])
+        
+        # Fetch one extra row to know whether another page follows
+        query += " ORDER BY fb.flight_date DESC, fb.booking_id DESC LIMIT %s"
+        params.append(page_size + 1)
         
         cursor.execute(query, params)
-        bookings = [dict(row) for row in cursor.fetchall()]
+        bookings = cursor.fetchall()
+        
+        next_cursor = None
+        if len(bookings) > page_size:
+            bookings = bookings[:page_size]
+            last = bookings[-1]
+            next_cursor = f"{last['flight_date']}:{last['booking_id']}"
         
-        return json.dumps({
+        return dump_json({
             "passenger_name": f"{passenger['first_name']} {passenger['last_name']}",
             "passenger_email": passenger["email"],
             "is_corporate": bool(passenger["is_corporate"]),
             "company": passenger["company_name"],
             "bookings_count": len(bookings),
-            "bookings": bookings
-        }, indent=2, default=str)
+            "bookings": bookings,
+            "next_cursor": next_cursor
+        })
 
 
 @mcp.tool
@@ -720,63 +1328,56 @@ def cancel_flight_booking(
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
-        try:
-            # Get passenger
-            cursor.execute("""
-                SELECT passenger_id FROM passengers WHERE LOWER(email) = LOWER(%s)
-            """, (passenger_email,))
-            
-            passenger = cursor.fetchone()
-            if not passenger:
-                raise ValueError("Passenger not found")
-            
-            passenger_id = passenger["passenger_id"]
-            
-            # Get booking
-            cursor.execute("""
-                SELECT passenger_id, flight_id, flight_date, cabin_class, booking_status
-                FROM flight_bookings
-                WHERE booking_reference = %s
-            """, (booking_reference,))
-            
-            booking = cursor.fetchone()
-            if not booking:
-                raise ValueError("Booking not found")
-            
-            if booking["passenger_id"] != passenger_id:
-                raise ValueError("Unauthorized: Booking does not belong to this passenger")
-            
-            if booking["booking_status"] == "cancelled":
-                raise ValueError("Booking is already cancelled")
-            
-            # Update booking status
-            cursor.execute("""
-                UPDATE flight_bookings
-                SET booking_status = 'cancelled'
-                WHERE booking_reference = %s
-            """, (booking_reference,))
-            
-            # Restore seat inventory
-            cursor.execute("""
-                UPDATE flight_inventory
-                SET available_seats = available_seats + 1
-                WHERE flight_id = %s
-                    AND flight_date = %s
-                    AND cabin_class = %s
-            """, (booking["flight_id"], booking["flight_date"], booking["cabin_class"]))
-            
-            conn.commit()
-            
-            return json.dumps({
-                "success": True,
-                "booking_reference": booking_reference,
-                "status": "cancelled",
-                "message": "Flight booking cancelled successfully. Seat inventory restored."
-            }, indent=2)
-        
-        except Exception as e:
-            conn.rollback()
-            raise
+        # Get passenger
+        cursor.execute("""
+            SELECT passenger_id FROM passengers WHERE LOWER(email) = LOWER(%s)
+        """, (passenger_email,))
+        
+        passenger = cursor.fetchone()
+        if not passenger:
+            raise ValueError("Passenger not found")
+        
+        passenger_id = passenger["passenger_id"]
+        
+        # Get booking
+        cursor.execute("""
+            SELECT passenger_id, flight_id, flight_date, cabin_class, booking_status
+            FROM flight_bookings
+            WHERE booking_reference = %s
+        """, (booking_reference,))
+        
+        booking = cursor.fetchone()
+        if not booking:
+            raise ValueError("Booking not found")
+        
+        if booking["passenger_id"] != passenger_id:
+            raise ValueError("Unauthorized: Booking does not belong to this passenger")
+        
+        if booking["booking_status"] == "cancelled":
+            raise ValueError("Booking is already cancelled")
+        
+        # Update booking status
+        cursor.execute("""
+            UPDATE flight_bookings
+            SET booking_status = 'cancelled'
+            WHERE booking_reference = %s
+        """, (booking_reference,))
+        
+        # Restore seat inventory
+        cursor.execute("""
+            UPDATE flight_inventory
+            SET available_seats = available_seats + 1
+            WHERE flight_id = %s
+                AND flight_date = %s
+                AND cabin_class = %s
+        """, (booking["flight_id"], booking["flight_date"], booking["cabin_class"]))
+        
+        return dump_json({
+            "success": True,
+            "booking_reference": booking_reference,
+            "status": "cancelled",
+            "message": "Flight booking cancelled successfully. Seat inventory restored."
+        })
 
 
 @mcp.tool
@@ -801,22 +1402,20 @@ def calculate_flight_cost(
         cursor = conn.cursor()
         
         # Get flight and pricing info
-        cursor.execute("""
+        cursor.execute(f"""
             SELECT 
-                al.airline_name,
+                r.airline_name,
                 al.corporate_discount_percent,
-                f.flight_number,
-                orig.city as origin_city,
-                dest.city as destination_city,
-                f.duration_minutes,
+                r.flight_number,
+                r.origin_city,
+                r.destination_city,
+                {DURATION_HOURS_SQL},
                 fi.base_price,
                 fi.price_multiplier
-            FROM flights f
-            JOIN airlines al ON f.airline_id = al.airline_id
-            JOIN airports orig ON f.origin_airport_id = orig.airport_id
-            JOIN airports dest ON f.destination_airport_id = dest.airport_id
-            JOIN flight_inventory fi ON f.flight_id = fi.flight_id
-            WHERE f.flight_id = %s
+            FROM flight_route_mv r
+            JOIN airlines al ON r.airline_id = al.airline_id
+            JOIN flight_inventory fi ON r.flight_id = fi.flight_id
+            WHERE r.flight_id = %s
                 AND fi.flight_date = %s
                 AND fi.cabin_class = %s
         """, (flight_id, travel_date, cabin_class))
@@ -833,12 +1432,12 @@ def calculate_flight_cost(
             info["corporate_discount_percent"]
         )
         
-        return json.dumps({
+        return dump_json({
             "flight": {
                 "airline": info["airline_name"],
                 "flight_number": info["flight_number"],
                 "route": f"{info['origin_city']} to {info['destination_city']}",
-                "duration_hours": round(info["duration_minutes"] / 60, 1)
+                "duration_hours": info["duration_hours"]
             },
             "travel_details": {
                 "travel_date": travel_date,
@@ -852,7 +1451,7 @@ def calculate_flight_cost(
                 "final_price": pricing["final_price"]
             },
             "is_corporate_booking": is_corporate
-        }, indent=2, default=str)
+        })
 
 
 @mcp.tool
@@ -865,43 +1464,12 @@ def get_airlines(country: Optional[str] = None) -> str:
     Returns:
         JSON string with list of airlines
     """
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
-        if country:
-            cursor.execute("""
-                SELECT 
-                    airline_id,
-                    airline_code,
-                    airline_name,
-                    country,
-                    corporate_discount_percent,
-                    is_preferred_vendor,
-                    hub_airport
-                FROM airlines
-                WHERE LOWER(country) = LOWER(%s)
-                ORDER BY airline_name
-            """, (country,))
-        else:
-            cursor.execute("""
-                SELECT 
-                    airline_id,
-                    airline_code,
-                    airline_name,
-                    country,
-                    corporate_discount_percent,
-                    is_preferred_vendor,
-                    hub_airport
-                FROM airlines
-                ORDER BY airline_name
-            """)
-        
-        airlines = [dict(row) for row in cursor.fetchall()]
-        
-        return json.dumps({
-            "airlines_count": len(airlines),
-            "airlines": airlines
-        }, indent=2, default=str)
+    airlines = fetch_airlines(country)
+    
+    return dump_json({
+        "airlines_count": len(airlines),
+        "airlines": airlines
+    })
 
 
 @mcp.tool
@@ -915,37 +1483,12 @@ def get_airports(city: Optional[str] = None, country: Optional[str] = None) -> s
     Returns:
         JSON string with list of airports
     """
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        
-        if city:
-            cursor.execute("""
-                SELECT *
-                FROM airports
-                WHERE LOWER(city) = LOWER(%s)
-                ORDER BY airport_name
-            """, (city,))
-        elif country:
-            cursor.execute("""
-                SELECT *
-                FROM airports
-                WHERE LOWER(country) = LOWER(%s)
-                ORDER BY city, airport_name
-            """, (country,))
-        else:
-            cursor.execute("""
-                SELECT DISTINCT city, state, country, COUNT(airport_id) as airport_count
-                FROM airports
-                GROUP BY city, state, country
-                ORDER BY city
-            """)
-        
-        airports = [dict(row) for row in cursor.fetchall()]
-        
-        return json.dumps({
-            "airports_count": len(airports),
-            "airports": airports
-        }, indent=2, default=str)
+    airports = fetch_airports(city, country)
+    
+    return dump_json({
+        "airports_count": len(airports),
+        "airports": airports
+    })
 
 
 @mcp.tool
@@ -962,25 +1505,14 @@ def get_baggage_allowance(airline_code: str, cabin_class: str = "economy") -> st
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT 
-                al.airline_name,
-                al.airline_code,
-                ba.cabin_class,
-                ba.checked_bags,
-                ba.checked_bag_weight_kg,
-                ba.carry_on_bags,
-                ba.carry_on_weight_kg
-            FROM baggage_allowance ba
-            JOIN airlines al ON ba.airline_id = al.airline_id
-            WHERE al.airline_code = %s AND ba.cabin_class = %s
-        """, (airline_code, cabin_class))
+        # The response object is built by the query
+        execute_prepared(cursor, "baggage_allowance", (airline_code, cabin_class))
         
         result = cursor.fetchone()
         if not result:
             raise ValueError("Baggage allowance not found for this airline and cabin class")
         
-        return json.dumps(dict(result), indent=2, default=str)
+        return dump_json(result["response"])
 
 
 @mcp.tool
@@ -992,54 +1524,15 @@ def get_route_options(origin_city: str, destination_city: str) -> str:
         destination_city: Arrival city
     
     Returns:
-        JSON string with available routes and airlines
+        JSON string with available routes and airlines, best options first
     """
     with get_db_connection() as conn:
         cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT DISTINCT
-                al.airline_name,
-                al.airline_code,
-                al.is_preferred_vendor,
-                al.corporate_discount_percent,
-                al.country as airline_country,
-                f.flight_number,
-                f.flight_id,
-                orig.airport_code as origin_code,
-                orig.airport_name as origin_airport,
-                dest.airport_code as destination_code,
-                dest.airport_name as destination_airport,
-                f.departure_time,
-                f.arrival_time,
-                f.duration_minutes,
-                f.aircraft_type
-            FROM flights f
-            JOIN airlines al ON f.airline_id = al.airline_id
-            JOIN airports orig ON f.origin_airport_id = orig.airport_id
-            JOIN airports dest ON f.destination_airport_id = dest.airport_id
-            WHERE LOWER(orig.city) = LOWER(%s)
-                AND LOWER(dest.city) = LOWER(%s)
-            ORDER BY al.airline_name, f.departure_time
-        """, (origin_city, destination_city))
-        
-        routes = [dict(row) for row in cursor.fetchall()]
-        
-        if not routes:
-            return json.dumps({
-                "message": f"No direct flights found between {origin_city} and {destination_city}",
-                "routes_count": 0,
-                "routes": []
-            }, indent=2)
-        
-        for route in routes:
-            route["duration_hours"] = round(route["duration_minutes"] / 60, 1)
+        # The response object, including the no-routes message, is built by the query
+        execute_prepared(cursor, "route_options", (origin_city, destination_city))
         
-        return json.dumps({
-            "route": f"{origin_city} to {destination_city}",
-            "routes_count": len(routes),
-            "routes": routes
-        }, indent=2, default=str)
+        return dump_json(cursor.fetchone()["response"])
 
 
 # ============================================================================
@@ -1047,7 +1540,7 @@ def get_route_options(origin_city: str, destination_city: str) -> str:
 # ============================================================================
 
 if __name__ == "__main__":
-    logger.info(f"Starting Airline Booking FastMCP Server (PostgreSQL)")
+    logger.info("Starting Airline Booking FastMCP Server (PostgreSQL)")
     # logger.info(f"Database: {DB_URL.split('@')[1].split('/')[0]}")  # Show host only
     
     mcp.run(transport="http")
@@ -1,103 +1,45 @@
 import psycopg2
 import psycopg2.extras
+import argparse
+import csv
 import datetime
+import io
+from collections import Counter
 import random
 import os
 
-def create_airline_booking_db_postgres(db_url):
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_FILE = os.path.join(BASE_DIR, 'schema.sql')
+SEED_DATA_DIR = os.path.join(BASE_DIR, 'seed_data')
+# Loaded in this order so the serial ids referenced by flights.csv line up
+SEED_TABLES = ('passengers', 'airlines', 'airports', 'flights')
+
+# (cabin class, price multiplier over economy, share of the aircraft's seats)
+CABIN_CLASSES = (('economy', 1.0, 0.70), ('premium_economy', 1.8, 0.15), ('business', 3.5, 0.10), ('first', 5.0, 0.05))
+# Smaller aircraft have no premium economy or first class cabin
+SMALL_AIRCRAFT_CABIN_CLASSES = tuple(cabin for cabin in CABIN_CLASSES if cabin[0] not in ('premium_economy', 'first'))
+BOOKING_STATUSES = ('confirmed', 'completed', 'cancelled')
+TRAVEL_PURPOSES = ('Business', 'Leisure', 'Conference')
+
+def create_airline_booking_db_postgres(conn):
     """
     Creates and populates a PostgreSQL database for an airline booking system.
     This function sets up the initial schema and a small sample of US-based data.
     """
-    conn = None
     try:
-        conn = psycopg2.connect(db_url)
         cursor = conn.cursor()
-        print("Successfully connected to PostgreSQL to create initial schema.")
-
-        sql_script = """
-        DROP VIEW IF EXISTS flight_booking_details_view;
-        DROP TABLE IF EXISTS flight_bookings; DROP TABLE IF EXISTS flight_inventory; DROP TABLE IF EXISTS baggage_allowance;
-        DROP TABLE IF EXISTS flights; DROP TABLE IF EXISTS airports; DROP TABLE IF EXISTS airlines; DROP TABLE IF EXISTS passengers;
-
-        CREATE TABLE passengers (
-            passenger_id SERIAL PRIMARY KEY, passenger_code TEXT UNIQUE NOT NULL, first_name TEXT NOT NULL, last_name TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL, phone TEXT, date_of_birth DATE, passport_number TEXT, is_corporate BOOLEAN DEFAULT FALSE,
-            company_name TEXT, frequent_flyer_number TEXT
-        );
-        CREATE TABLE airlines (
-            airline_id SERIAL PRIMARY KEY, airline_code TEXT UNIQUE NOT NULL, airline_name TEXT NOT NULL, country TEXT NOT NULL,
-            corporate_discount_percent NUMERIC(5, 2) DEFAULT 0, is_preferred_vendor BOOLEAN DEFAULT FALSE, hub_airport TEXT
-        );
-        CREATE TABLE airports (
-            airport_id SERIAL PRIMARY KEY, airport_code TEXT UNIQUE NOT NULL, airport_name TEXT NOT NULL, city TEXT NOT NULL,
-            state TEXT, country TEXT NOT NULL, timezone TEXT, latitude NUMERIC(9, 6), longitude NUMERIC(9, 6)
-        );
-        CREATE TABLE flights (
-            flight_id SERIAL PRIMARY KEY, airline_id INTEGER REFERENCES airlines(airline_id) ON DELETE CASCADE, flight_number TEXT NOT NULL,
-            origin_airport_id INTEGER REFERENCES airports(airport_id), destination_airport_id INTEGER REFERENCES airports(airport_id),
-            departure_time TIME NOT NULL, arrival_time TIME NOT NULL, duration_minutes INTEGER NOT NULL,
-            aircraft_type TEXT, total_seats INTEGER DEFAULT 180, UNIQUE(airline_id, flight_number)
-        );
-        CREATE TABLE baggage_allowance (
-            baggage_id SERIAL PRIMARY KEY, airline_id INTEGER REFERENCES airlines(airline_id) ON DELETE CASCADE, cabin_class TEXT NOT NULL,
-            checked_bags INTEGER DEFAULT 0, checked_bag_weight_kg INTEGER DEFAULT 23, carry_on_bags INTEGER DEFAULT 1, carry_on_weight_kg INTEGER DEFAULT 7
-        );
-        CREATE TABLE flight_inventory (
-            inventory_id SERIAL PRIMARY KEY, flight_id INTEGER REFERENCES flights(flight_id) ON DELETE CASCADE, flight_date DATE NOT NULL,
-            cabin_class TEXT NOT NULL, base_price NUMERIC(10, 2) NOT NULL, available_seats INTEGER DEFAULT 0,
-            price_multiplier NUMERIC(4, 2) DEFAULT 1.0, UNIQUE(flight_id, flight_date, cabin_class)
-        );
-        CREATE TABLE flight_bookings (
-            booking_id SERIAL PRIMARY KEY, booking_reference TEXT UNIQUE NOT NULL, passenger_id INTEGER REFERENCES passengers(passenger_id),
-            flight_id INTEGER REFERENCES flights(flight_id), flight_date DATE NOT NULL, cabin_class TEXT NOT NULL, seat_number TEXT,
-            ticket_price NUMERIC(10, 2) NOT NULL, corporate_discount NUMERIC(10, 2) DEFAULT 0, checked_bags INTEGER DEFAULT 0,
-            booking_status TEXT DEFAULT 'confirmed', purpose_of_travel TEXT, booked_at TIMESTAMPTZ DEFAULT NOW()
-        );
-
-        CREATE INDEX idx_passengers_email ON passengers(email); CREATE INDEX idx_flights_route ON flights(origin_airport_id, destination_airport_id);
-        CREATE INDEX idx_inventory_date ON flight_inventory(flight_date); CREATE INDEX idx_bookings_passenger ON flight_bookings(passenger_id);
-
-        INSERT INTO passengers (passenger_code, first_name, last_name, email, is_corporate, company_name, frequent_flyer_number) VALUES
-        ('CORP001', 'John', 'Smith', 'john.smith@techcorp.com', TRUE, 'TechCorp Inc.', 'TC123456'),
-        ('CORP002', 'Jane', 'Doe', 'jane.doe@innovate.io', TRUE, 'Innovate Solutions', 'IS789012'),
-        ('INDV001', 'Mary', 'Williams', 'mary.w@email.com', FALSE, NULL, NULL);
-
-        INSERT INTO airlines (airline_code, airline_name, country, corporate_discount_percent, is_preferred_vendor, hub_airport) VALUES
-        ('AA', 'American Airlines', 'USA', 15.00, TRUE, 'DFW'), ('DL', 'Delta Air Lines', 'USA', 18.00, TRUE, 'ATL'),
-        ('UA', 'United Airlines', 'USA', 20.00, TRUE, 'ORD'), ('WN', 'Southwest Airlines', 'USA', 10.00, FALSE, 'DAL');
-
-        INSERT INTO airports (airport_code, airport_name, city, state, country, timezone, latitude, longitude) VALUES
-        ('JFK', 'John F. Kennedy Intl', 'New York', 'NY', 'USA', 'America/New_York', 40.6413, -73.7781),
-        ('LAX', 'Los Angeles Intl', 'Los Angeles', 'CA', 'USA', 'America/Los_Angeles', 33.9416, -118.4085),
-        ('ORD', 'O''Hare Intl', 'Chicago', 'IL', 'USA', 'America/Chicago', 41.9742, -87.9073),
-        ('DFW', 'Dallas/Fort Worth Intl', 'Dallas', 'TX', 'USA', 'America/Chicago', 32.8998, -97.0403),
-        ('DEN', 'Denver Intl', 'Denver', 'CO', 'USA', 'America/Denver', 39.8561, -104.6737),
-        ('SFO', 'San Francisco Intl', 'San Francisco', 'CA', 'USA', 'America/Los_Angeles', 37.6213, -122.3790),
-        ('ATL', 'Hartsfield-Jackson Atlanta Intl', 'Atlanta', 'GA', 'USA', 'America/New_York', 33.6407, -84.4277);
-
-        INSERT INTO flights (airline_id, flight_number, origin_airport_id, destination_airport_id, departure_time, arrival_time, duration_minutes, aircraft_type, total_seats) VALUES
-        (1, 'AA100', 1, 2, '08:00', '11:30', 360, 'Boeing 777', 310), (2, 'DL500', 7, 2, '07:30', '11:00', 330, 'Airbus A330', 290),
-        (3, 'UA400', 3, 6, '09:00', '11:30', 270, 'Boeing 787', 250);
-
-        CREATE VIEW flight_booking_details_view AS
-        SELECT fb.booking_id, fb.booking_reference, p.first_name || ' ' || p.last_name as passenger_name, p.is_corporate, p.company_name,
-            al.airline_name, f.flight_number, orig.airport_code as origin_code, dest.airport_code as destination_code,
-            fb.flight_date, f.departure_time, fb.ticket_price, fb.booking_status
-        FROM flight_bookings fb JOIN passengers p ON fb.passenger_id = p.passenger_id JOIN flights f ON fb.flight_id = f.flight_id
-        JOIN airlines al ON f.airline_id = al.airline_id JOIN airports orig ON f.origin_airport_id = orig.airport_id
-        JOIN airports dest ON f.destination_airport_id = dest.airport_id;
-        """
-        for statement in sql_script.split(';'):
-            if statement.strip():
-                cursor.execute(statement)
+
+        with open(SCHEMA_FILE) as schema_file:
+            cursor.execute(schema_file.read())
+        for table in SEED_TABLES:
+            with open(os.path.join(SEED_DATA_DIR, f'{table}.csv'), newline='') as seed_file:
+                columns = seed_file.readline().strip()
+                cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)", seed_file)
         print("Initial schema and sample US data created successfully.")
         conn.commit()
     except psycopg2.Error as e:
         print(f"Database error during initial setup: {e}")
-        if conn: conn.rollback()
-    finally:
-        if conn: conn.close()
+        conn.rollback()
 
 def populate_flight_inventory(cursor, days=90):
     """Populates the flight_inventory for all existing flights for a number of days."""
@@ -105,34 +47,47 @@ def populate_flight_inventory(cursor, days=90):
     cursor.execute("SELECT flight_id, total_seats FROM flights")
     all_flights = cursor.fetchall()
 
-    cabin_class_pricing = {'economy': 1.0, 'premium_economy': 1.8, 'business': 3.5, 'first': 5.0}
-    seat_distribution = {'economy': 0.70, 'premium_economy': 0.15, 'business': 0.10, 'first': 0.05}
+    # Dates, price drift and weekend surcharges are the same for every flight, so work them out once
+    start_date = datetime.date.today()
+    flight_days = []
+    for i in range(days):
+        flight_date = start_date + datetime.timedelta(days=i)
+        flight_days.append((flight_date, i / 180.0, 1.2 if flight_date.weekday() in (4, 5, 6) else 1.0))
 
     inventory_records = []
-    start_date = datetime.date.today()
+    uniform, choice = random.uniform, random.choice
     for flight_id, total_seats in all_flights:
-        economy_base_price = random.uniform(150, 700) # Increased range for international
-        for i in range(days):
-            flight_date = start_date + datetime.timedelta(days=i)
-            price_multiplier = 1.0 + (random.choice([-1, 1]) * (i / 180.0)) # Fluctuate price over time
-            if flight_date.weekday() in [4, 5, 6]: price_multiplier *= 1.2
-
-            for cabin_class, class_multiplier in cabin_class_pricing.items():
-                if total_seats < 200 and cabin_class in ['premium_economy', 'first']: continue
-
-                available_seats = int(total_seats * seat_distribution[cabin_class] * random.uniform(0.3, 1.0))
-                inventory_records.append((flight_id, flight_date, cabin_class, round(economy_base_price * class_multiplier, 2), available_seats, round(price_multiplier, 2)))
-
-    psycopg2.extras.execute_batch(cursor, "INSERT INTO flight_inventory (flight_id, flight_date, cabin_class, base_price, available_seats, price_multiplier) VALUES (%s, %s, %s, %s, %s, %s) ON CONFLICT (flight_id, flight_date, cabin_class) DO NOTHING", inventory_records)
+        economy_base_price = uniform(150, 700) # Increased range for international
+        cabins = SMALL_AIRCRAFT_CABIN_CLASSES if total_seats < 200 else CABIN_CLASSES
+        cabin_prices = [(cabin_class, round(economy_base_price * class_multiplier, 2), total_seats * share) for cabin_class, class_multiplier, share in cabins]
+        for flight_date, drift, weekend_surcharge in flight_days:
+            price_multiplier = round((1.0 + choice((-1, 1)) * drift) * weekend_surcharge, 2) # Fluctuate price over time
+            for cabin_class, base_price, cabin_seats in cabin_prices:
+                inventory_records.append((flight_id, flight_date, cabin_class, base_price, int(cabin_seats * uniform(0.3, 1.0)), price_multiplier))
+
+    # COPY into a staging table, then merge so existing inventory rows are kept
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(inventory_records)
+    buffer.seek(0)
+    cursor.execute("""
+        CREATE TEMP TABLE inventory_load (
+            flight_id INTEGER, flight_date DATE, cabin_class TEXT, base_price NUMERIC(10, 2),
+            available_seats INTEGER, price_multiplier NUMERIC(4, 2)
+        ) ON COMMIT DROP
+    """)
+    cursor.copy_expert("COPY inventory_load (flight_id, flight_date, cabin_class, base_price, available_seats, price_multiplier) FROM STDIN WITH (FORMAT csv)", buffer)
+    cursor.execute("""
+        INSERT INTO flight_inventory (flight_id, flight_date, cabin_class, base_price, available_seats, price_multiplier)
+        SELECT flight_id, flight_date, cabin_class, base_price, available_seats, price_multiplier FROM inventory_load
+        ON CONFLICT (flight_id, flight_date, cabin_class) DO NOTHING
+    """)
     # Corrected logging to show the number of records attempted, not cursor.rowcount for batch
     print(f"Attempted to insert {len(inventory_records)} inventory records.")
 
-def add_international_data(db_url):
+def add_international_data(conn):
     """Adds a set of international airlines, airports, and flights to the database."""
     print("\nAdding international airlines and airports...")
-    conn = None
     try:
-        conn = psycopg2.connect(db_url)
         cursor = conn.cursor()
 
         airlines_data = [
@@ -171,10 +126,9 @@ def add_international_data(db_url):
             ('BCN', 'Barcelona–El Prat Airport', 'Barcelona', None, 'Spain', 'Europe/Madrid', 41.2974, 2.0833)
         ]
 
-        psycopg2.extras.execute_batch(cursor, "INSERT INTO airlines (airline_code, airline_name, country, corporate_discount_percent, is_preferred_vendor, hub_airport) VALUES (%s, %s, %s, %s, %s, %s) ON CONFLICT (airline_code) DO NOTHING", airlines_data)
-        psycopg2.extras.execute_batch(cursor, "INSERT INTO airports (airport_code, airport_name, city, state, country, timezone, latitude, longitude) VALUES (%s, %s, %s, %s, %s, %s, %s, %s) ON CONFLICT (airport_code) DO NOTHING", airports_data)
+        psycopg2.extras.execute_values(cursor, "INSERT INTO airlines (airline_code, airline_name, country, corporate_discount_percent, is_preferred_vendor, hub_airport) VALUES %s ON CONFLICT (airline_code) DO NOTHING", airlines_data, template="(%s, %s, %s, %s, %s, %s)", page_size=100)
+        psycopg2.extras.execute_values(cursor, "INSERT INTO airports (airport_code, airport_name, city, state, country, timezone, latitude, longitude) VALUES %s ON CONFLICT (airport_code) DO NOTHING", airports_data, template="(%s, %s, %s, %s, %s, %s, %s, %s)", page_size=100)
         print(f"Processed {len(airlines_data)} airlines and {len(airports_data)} airports.")
-        conn.commit()
 
         print("\nAdding new international flight routes...")
         cursor.execute("SELECT airline_id FROM airlines WHERE country != 'USA'")
@@ -190,25 +144,20 @@ def add_international_data(db_url):
                 airline_id, f'INT{1000+i}', origin, dest, f"{random.randint(0,23):02d}:{random.randint(0,59):02d}", f"{random.randint(0,23):02d}:{random.randint(0,59):02d}",
                 random.randint(300, 900), random.choice(['Boeing 787', 'Airbus A350', 'Boeing 777']), random.randint(250, 400)
             ))
-        psycopg2.extras.execute_batch(cursor, "INSERT INTO flights (airline_id, flight_number, origin_airport_id, destination_airport_id, departure_time, arrival_time, duration_minutes, aircraft_type, total_seats) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) ON CONFLICT (airline_id, flight_number) DO NOTHING", new_flights)
+        psycopg2.extras.execute_values(cursor, "INSERT INTO flights (airline_id, flight_number, origin_airport_id, destination_airport_id, departure_time, arrival_time, duration_minutes, aircraft_type, total_seats) VALUES %s ON CONFLICT (airline_id, flight_number) DO NOTHING", new_flights, template="(%s, %s, %s, %s, %s, %s, %s, %s, %s)", page_size=100)
         print(f"Attempted to insert {len(new_flights)} new international flights.")
-        conn.commit()
 
         populate_flight_inventory(cursor)
         conn.commit()
 
     except psycopg2.Error as e:
         print(f"Database error while adding international data: {e}")
-        if conn: conn.rollback()
-    finally:
-        if conn: conn.close()
+        conn.rollback()
 
-def add_more_passengers(db_url, num_passengers=100):
+def add_more_passengers(conn, num_passengers=100):
     """Adds a specified number of randomly generated passengers to the database."""
     print(f"\nAdding {num_passengers} new passengers...")
-    conn = None
     try:
-        conn = psycopg2.connect(db_url)
         cursor = conn.cursor()
         first_names = ['Robert', 'Jennifer', 'James', 'Patricia', 'Linda', 'William', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Karen', 'Charles', 'Nancy']
         last_names = ['Johnson', 'Garcia', 'Martinez', 'Rodriguez', 'Lee', 'Walker', 'Hall', 'Allen', 'Young', 'Hernandez', 'King', 'Wright', 'Lopez', 'Hill']
@@ -225,96 +174,201 @@ def add_more_passengers(db_url, num_passengers=100):
             company = random.choice(companies) if is_corp else None
             new_pax.append((f"PAX{pax_count+i:04d}", first, last, email, is_corp, company))
 
-        psycopg2.extras.execute_batch(cursor, "INSERT INTO passengers (passenger_code, first_name, last_name, email, is_corporate, company_name) VALUES (%s, %s, %s, %s, %s, %s) ON CONFLICT (email) DO NOTHING", new_pax)
+        psycopg2.extras.execute_values(cursor, "INSERT INTO passengers (passenger_code, first_name, last_name, email, is_corporate, company_name) VALUES %s ON CONFLICT (email) DO NOTHING", new_pax, page_size=500)
         print(f"Attempted to insert {len(new_pax)} new passengers.")
         conn.commit()
     except psycopg2.Error as e:
         print(f"Database error while adding passengers: {e}")
-        if conn: conn.rollback()
-    finally:
-        if conn: conn.close()
+        conn.rollback()
 
-def add_more_bookings(db_url, num_bookings=200):
+def add_more_bookings(conn, num_bookings=200):
     """Adds a specified number of randomly generated bookings using an efficient query strategy."""
     print(f"\nAdding {num_bookings} new bookings...")
-    conn = None
     try:
-        conn = psycopg2.connect(db_url)
         cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
         # Fetch data into memory. These tables are small enough.
         cursor.execute("SELECT p.* FROM passengers p")
         passengers = cursor.fetchall()
+        # Preload every bookable inventory row with its airline discount, then sample bookings in memory
         cursor.execute("""
-            SELECT f.flight_id, a.airline_id, a.corporate_discount_percent
-            FROM flights f
+            SELECT fi.flight_id, fi.flight_date, fi.cabin_class, fi.base_price, fi.price_multiplier, fi.available_seats,
+                a.corporate_discount_percent
+            FROM flight_inventory fi
+            JOIN flights f ON fi.flight_id = f.flight_id
             JOIN airlines a ON f.airline_id = a.airline_id
+            WHERE fi.available_seats > 0 AND fi.flight_date BETWEEN CURRENT_DATE + 1 AND CURRENT_DATE + 89
         """)
-        flights = cursor.fetchall()
-
-        cursor.execute("SELECT MAX(booking_id) from flight_bookings")
-        booking_counter = (cursor.fetchone()[0] or 0) + 1
+        inventory = {(row['flight_id'], row['flight_date'], row['cabin_class']): row for row in cursor.fetchall()}
+        seats_left = {key: seat_info['available_seats'] for key, seat_info in inventory.items()}
+        inventory_keys = list(inventory)
 
         new_bookings = []
-        cabin_classes = ['economy', 'premium_economy', 'business', 'first']
 
-        # Loop to create bookings one by one
-        while len(new_bookings) < num_bookings:
+        while len(new_bookings) < num_bookings and inventory_keys:
             passenger = random.choice(passengers)
-            flight = random.choice(flights)
-            flight_date = datetime.date.today() + datetime.timedelta(days=random.randint(1, 89))
-            cabin_class = random.choice(cabin_classes)
-
-            # Targeted query for an available seat
-            cursor.execute("""
-                SELECT base_price, price_multiplier FROM flight_inventory
-                WHERE flight_id = %s AND flight_date = %s AND cabin_class = %s AND available_seats > 0
-            """, (flight['flight_id'], flight_date, cabin_class))
-
-            seat_info = cursor.fetchone()
-
-            if seat_info:
-                ticket_price = seat_info['base_price'] * seat_info['price_multiplier']
-                discount = 0
-                if passenger['is_corporate'] and flight['corporate_discount_percent'] > 0:
-                    discount = ticket_price * (flight['corporate_discount_percent'] / 100)
-
-                new_bookings.append((
-                    f"GEN-{booking_counter + len(new_bookings):06d}", passenger['passenger_id'], flight['flight_id'], flight_date, cabin_class,
-                    f"{random.randint(1,40)}{random.choice('ABCDEF')}", round(ticket_price - discount, 2), round(discount, 2),
-                    random.choice(['confirmed', 'completed', 'cancelled']), random.choice(['Business', 'Leisure', 'Conference'])
-                ))
+            key = random.choice(inventory_keys)
+            flight_id, flight_date, cabin_class = key
+            seat_info = inventory[key]
+
+            # Respect capacity within this run
+            seats_left[key] -= 1
+            if not seats_left[key]: inventory_keys.remove(key)
+
+            ticket_price = seat_info['base_price'] * seat_info['price_multiplier']
+            discount = 0
+            if passenger['is_corporate'] and seat_info['corporate_discount_percent'] > 0:
+                discount = ticket_price * (seat_info['corporate_discount_percent'] / 100)
+
+            new_bookings.append((
+                passenger['passenger_id'], flight_id, flight_date, cabin_class,
+                f"{random.randint(1,40)}{random.choice('ABCDEF')}", round(ticket_price - discount, 2), round(discount, 2),
+                random.choice(BOOKING_STATUSES), random.choice(TRAVEL_PURPOSES)
+            ))
 
         if new_bookings:
-            psycopg2.extras.execute_batch(cursor, """
-                INSERT INTO flight_bookings (booking_reference, passenger_id, flight_id, flight_date, cabin_class, seat_number,
+            # Take the seats held by non-cancelled bookings in one statement. Rows that no longer have
+            # enough seats are skipped, and the whole batch is abandoned rather than oversold.
+            seats_taken = Counter((booking[1], booking[2], booking[3]) for booking in new_bookings if booking[7] != 'cancelled')
+            updated = psycopg2.extras.execute_values(cursor, """
+                UPDATE flight_inventory fi SET available_seats = fi.available_seats - t.seats
+                FROM (VALUES %s) AS t (flight_id, flight_date, cabin_class, seats)
+                WHERE fi.flight_id = t.flight_id AND fi.flight_date = t.flight_date AND fi.cabin_class = t.cabin_class
+                    AND fi.available_seats >= t.seats
+                RETURNING fi.inventory_id""", [key + (seats,) for key, seats in seats_taken.items()], fetch=True)
+            if len(updated) != len(seats_taken):
+                print("Inventory changed while generating bookings. No bookings were added.")
+                conn.rollback()
+                return
+
+            booking_ids = psycopg2.extras.execute_values(cursor, """
+                INSERT INTO flight_bookings (passenger_id, flight_id, flight_date, cabin_class, seat_number,
                 ticket_price, corporate_discount, booking_status, purpose_of_travel)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""", new_bookings)
-            print(f"Successfully inserted {len(new_bookings)} new bookings.")
+                VALUES %s RETURNING booking_id""", new_bookings, page_size=500, fetch=True)
+            print(f"Successfully inserted {len(booking_ids)} new bookings (ids {min(booking_ids)[0]}-{max(booking_ids)[0]}).")
             conn.commit()
         else:
             print("Could not generate any new bookings. Check inventory.")
 
     except psycopg2.Error as e:
         print(f"Database error while adding bookings: {e}")
-        if conn: conn.rollback()
-    finally:
-        if conn: conn.close()
+        conn.rollback()
+
+# Idempotent additions on top of the base schema. Safe to run against an existing database
+# (python create_airlines_db.py --upgrade), and required before deploying a server that uses them.
+SCHEMA_UPGRADES_SQL = """
+CREATE SEQUENCE IF NOT EXISTS booking_ref_seq MAXVALUE 999999 CYCLE;
+
+-- search_flights: city lookups, and a partial index on the inventory predicate that also carries the
+-- fare. Results are sorted after the discount is applied, so the index narrows rows but does not order them.
+-- Unconstrained NUMERIC holds every NUMERIC(10, 2) * NUMERIC(4, 2) product; the ALTER widens columns created
+-- by earlier upgrades and is a no-op once the type matches.
+ALTER TABLE flight_inventory ADD COLUMN IF NOT EXISTS effective_price NUMERIC
+    GENERATED ALWAYS AS (base_price * price_multiplier) STORED;
+ALTER TABLE flight_inventory ALTER COLUMN effective_price TYPE NUMERIC;
+CREATE INDEX IF NOT EXISTS idx_airports_lower_city ON airports (LOWER(city));
+-- idx_flights_route only serves lookups that lead with the origin
+CREATE INDEX IF NOT EXISTS idx_flights_dest ON flights (destination_airport_id);
+CREATE INDEX IF NOT EXISTS idx_fi_date_cabin_price ON flight_inventory (flight_date, cabin_class, effective_price) WHERE available_seats > 0;
+-- Superseded by idx_fi_date_cabin_price
+DROP INDEX IF EXISTS idx_fi_date_cabin_seats;
+
+-- Case-insensitive email lookups; the plain email index duplicates the UNIQUE constraint
+CREATE UNIQUE INDEX IF NOT EXISTS idx_passengers_lower_email ON passengers (LOWER(email));
+DROP INDEX IF EXISTS idx_passengers_email;
+
+-- list_bookings_by_email
+CREATE INDEX IF NOT EXISTS idx_bookings_passenger_date ON flight_bookings (passenger_id, flight_date DESC, booking_id DESC);
+
+-- Denormalized flight + airline + airport rows for the read tools. Only columns that describe the route
+-- are stored; corporate_discount_percent and is_preferred_vendor are read from airlines at query time.
+-- Rebuilt on every run so column changes are picked up.
+DROP MATERIALIZED VIEW IF EXISTS flight_route_mv;
+CREATE MATERIALIZED VIEW flight_route_mv AS
+SELECT
+    f.*,
+    al.airline_name, al.airline_code, al.hub_airport, al.country AS airline_country,
+    orig.airport_code AS origin_code, orig.airport_name AS origin_airport, orig.city AS origin_city,
+    orig.state AS origin_state, orig.country AS origin_country,
+    dest.airport_code AS destination_code, dest.airport_name AS destination_airport, dest.city AS destination_city,
+    dest.state AS destination_state, dest.country AS destination_country
+FROM flights f
+JOIN airlines al ON f.airline_id = al.airline_id
+JOIN airports orig ON f.origin_airport_id = orig.airport_id
+JOIN airports dest ON f.destination_airport_id = dest.airport_id;
+CREATE UNIQUE INDEX idx_flight_route_mv_flight ON flight_route_mv (flight_id);
+CREATE INDEX idx_flight_route_mv_cities ON flight_route_mv (LOWER(origin_city), LOWER(destination_city));
+
+-- Keep flight_route_mv in step with the catalog: any change to flights, airlines or airports refreshes it
+-- in the same transaction. CONCURRENTLY (using the unique index above) keeps the view readable meanwhile.
+CREATE OR REPLACE FUNCTION refresh_flight_route_mv() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY flight_route_mv;
+    RETURN NULL;
+END;
+$$;
+DROP TRIGGER IF EXISTS trg_flights_refresh_route_mv ON flights;
+CREATE TRIGGER trg_flights_refresh_route_mv AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON flights
+    FOR EACH STATEMENT EXECUTE FUNCTION refresh_flight_route_mv();
+DROP TRIGGER IF EXISTS trg_airlines_refresh_route_mv ON airlines;
+-- Discount and preferred-vendor changes do not touch the view
+CREATE TRIGGER trg_airlines_refresh_route_mv
+    AFTER INSERT OR UPDATE OF airline_id, airline_name, airline_code, hub_airport, country OR DELETE OR TRUNCATE ON airlines
+    FOR EACH STATEMENT EXECUTE FUNCTION refresh_flight_route_mv();
+DROP TRIGGER IF EXISTS trg_airports_refresh_route_mv ON airports;
+CREATE TRIGGER trg_airports_refresh_route_mv AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON airports
+    FOR EACH STATEMENT EXECUTE FUNCTION refresh_flight_route_mv();
+
+-- Refresh planner statistics so the new indexes are picked up straight away
+ANALYZE;
+"""
+
+def apply_schema_upgrades(conn):
+    """Applies the schema objects the MCP server relies on beyond the base schema."""
+    print("\nApplying schema upgrades...")
+    try:
+        cursor = conn.cursor()
+        cursor.execute(SCHEMA_UPGRADES_SQL)
+        conn.commit()
+        print("Schema upgrades applied successfully.")
+    except psycopg2.Error as e:
+        print(f"Database error while applying schema upgrades: {e}")
+        conn.rollback()
 
 
 if __name__ == '__main__':
+    # Deploying a server change that needs new schema objects: run this script with --upgrade against the
+    # live database first, then restart the MCP server. Without --upgrade the database is rebuilt from
+    # scratch, which drops every table and all existing bookings.
+    parser = argparse.ArgumentParser(description="Create and seed the airline booking database.")
+    parser.add_argument('--upgrade', action='store_true',
+                        help="only apply the schema upgrades to an existing database, keeping its data")
+    args = parser.parse_args()
+
     NEON_DB_URL = ''
 
-    # 1. Reset and create the base schema with minimal data
-    create_airline_booking_db_postgres(NEON_DB_URL)
+    # Every step runs on one connection and commits its own work
+    conn = psycopg2.connect(NEON_DB_URL)
+    print("Successfully connected to PostgreSQL.")
+    try:
+        if args.upgrade:
+            apply_schema_upgrades(conn)
+        else:
+            # 1. Reset and create the base schema with minimal data
+            create_airline_booking_db_postgres(conn)
+
+            # 2. Add international airlines, airports, and flight routes
+            add_international_data(conn)
 
-    # 2. Add international airlines, airports, and flight routes
-    add_international_data(NEON_DB_URL)
+            # 3. Add more passengers to the system
+            add_more_passengers(conn, num_passengers=100)
 
-    # 3. Add more passengers to the system
-    add_more_passengers(NEON_DB_URL, num_passengers=100)
+            # 4. Add 200 new bookings using the efficient method
+            add_more_bookings(conn, num_bookings=200)
 
-    # 4. Add 200 new bookings using the efficient method
-    add_more_bookings(NEON_DB_URL, num_bookings=200)
+            # 5. Add the sequences, indexes and views used by the MCP server
+            apply_schema_upgrades(conn)
+    finally:
+        conn.close()
 
-    print("\nAirline database population complete.")
\ No newline at end of file
+    print("\nSchema upgrade complete." if args.upgrade else "\nAirline database population complete.")
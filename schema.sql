@@ -0,0 +1,54 @@
+-- Base schema for the airline booking database. Loaded by create_airlines_db.py;
+-- the sample rows live in seed_data/*.csv.
+
+DROP VIEW IF EXISTS flight_booking_details_view; DROP MATERIALIZED VIEW IF EXISTS flight_route_mv;
+DROP TABLE IF EXISTS flight_bookings; DROP TABLE IF EXISTS flight_inventory; DROP TABLE IF EXISTS baggage_allowance;
+DROP TABLE IF EXISTS flights; DROP TABLE IF EXISTS airports; DROP TABLE IF EXISTS airlines; DROP TABLE IF EXISTS passengers;
+
+CREATE TABLE passengers (
+    passenger_id SERIAL PRIMARY KEY, passenger_code TEXT UNIQUE NOT NULL, first_name TEXT NOT NULL, last_name TEXT NOT NULL,
+    email TEXT UNIQUE NOT NULL, phone TEXT, date_of_birth DATE, passport_number TEXT, is_corporate BOOLEAN DEFAULT FALSE,
+    company_name TEXT, frequent_flyer_number TEXT
+);
+CREATE TABLE airlines (
+    airline_id SERIAL PRIMARY KEY, airline_code TEXT UNIQUE NOT NULL, airline_name TEXT NOT NULL, country TEXT NOT NULL,
+    corporate_discount_percent NUMERIC(5, 2) DEFAULT 0, is_preferred_vendor BOOLEAN DEFAULT FALSE, hub_airport TEXT
+);
+CREATE TABLE airports (
+    airport_id SERIAL PRIMARY KEY, airport_code TEXT UNIQUE NOT NULL, airport_name TEXT NOT NULL, city TEXT NOT NULL,
+    state TEXT, country TEXT NOT NULL, timezone TEXT, latitude NUMERIC(9, 6), longitude NUMERIC(9, 6)
+);
+CREATE TABLE flights (
+    flight_id SERIAL PRIMARY KEY, airline_id INTEGER REFERENCES airlines(airline_id) ON DELETE CASCADE, flight_number TEXT NOT NULL,
+    origin_airport_id INTEGER REFERENCES airports(airport_id), destination_airport_id INTEGER REFERENCES airports(airport_id),
+    departure_time TIME NOT NULL, arrival_time TIME NOT NULL, duration_minutes INTEGER NOT NULL,
+    aircraft_type TEXT, total_seats INTEGER DEFAULT 180, UNIQUE(airline_id, flight_number)
+);
+CREATE TABLE baggage_allowance (
+    baggage_id SERIAL PRIMARY KEY, airline_id INTEGER REFERENCES airlines(airline_id) ON DELETE CASCADE, cabin_class TEXT NOT NULL,
+    checked_bags INTEGER DEFAULT 0, checked_bag_weight_kg INTEGER DEFAULT 23, carry_on_bags INTEGER DEFAULT 1, carry_on_weight_kg INTEGER DEFAULT 7
+);
+CREATE TABLE flight_inventory (
+    inventory_id SERIAL PRIMARY KEY, flight_id INTEGER REFERENCES flights(flight_id) ON DELETE CASCADE, flight_date DATE NOT NULL,
+    cabin_class TEXT NOT NULL, base_price NUMERIC(10, 2) NOT NULL, available_seats INTEGER DEFAULT 0,
+    price_multiplier NUMERIC(4, 2) DEFAULT 1.0, UNIQUE(flight_id, flight_date, cabin_class)
+);
+CREATE TABLE flight_bookings (
+    booking_id SERIAL PRIMARY KEY, booking_reference TEXT UNIQUE NOT NULL, passenger_id INTEGER REFERENCES passengers(passenger_id),
+    flight_id INTEGER REFERENCES flights(flight_id), flight_date DATE NOT NULL, cabin_class TEXT NOT NULL, seat_number TEXT,
+    ticket_price NUMERIC(10, 2) NOT NULL, corporate_discount NUMERIC(10, 2) DEFAULT 0, checked_bags INTEGER DEFAULT 0,
+    booking_status TEXT DEFAULT 'confirmed', purpose_of_travel TEXT, booked_at TIMESTAMPTZ DEFAULT NOW()
+);
+CREATE SEQUENCE flight_bookings_reference_seq OWNED BY flight_bookings.booking_reference;
+ALTER TABLE flight_bookings ALTER COLUMN booking_reference SET DEFAULT ('GEN-' || LPAD(nextval('flight_bookings_reference_seq')::text, 6, '0'));
+
+CREATE INDEX idx_passengers_email ON passengers(email); CREATE INDEX idx_flights_route ON flights(origin_airport_id, destination_airport_id);
+CREATE INDEX idx_inventory_date ON flight_inventory(flight_date); CREATE INDEX idx_bookings_passenger ON flight_bookings(passenger_id);
+
+CREATE VIEW flight_booking_details_view AS
+SELECT fb.booking_id, fb.booking_reference, p.first_name || ' ' || p.last_name as passenger_name, p.is_corporate, p.company_name,
+    al.airline_name, f.flight_number, orig.airport_code as origin_code, dest.airport_code as destination_code,
+    fb.flight_date, f.departure_time, fb.ticket_price, fb.booking_status
+FROM flight_bookings fb JOIN passengers p ON fb.passenger_id = p.passenger_id JOIN flights f ON fb.flight_id = f.flight_id
+JOIN airlines al ON f.airline_id = al.airline_id JOIN airports orig ON f.origin_airport_id = orig.airport_id
+JOIN airports dest ON f.destination_airport_id = dest.airport_id;